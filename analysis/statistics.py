@@ -4,11 +4,14 @@ Computes summary statistics, temporal patterns, correlations,
 and distribution tests to justify twin-city selection.
 """
 
+import csv
 import logging
+import math
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
+from scipy import special
 from scipy import stats as scipy_stats
 
 from config import REPORTS_DIR
@@ -31,7 +34,6 @@ def compute_summary_statistics(df: pd.DataFrame, city_key: str) -> dict:
         logger.warning(f"  {city_key}: Empty dataset, skipping statistics")
         return {"city": city_key, "n_records": 0}
 
-    pm = df["pm25"]
     result = {
         "city": city_key,
         "n_records": len(df),
@@ -39,73 +41,83 @@ def compute_summary_statistics(df: pd.DataFrame, city_key: str) -> dict:
         "date_min": str(df["datetime_utc"].min()),
         "date_max": str(df["datetime_utc"].max()),
         "unique_hours": df["datetime_utc"].nunique(),
-        # PM2.5 statistics
-        "pm25_mean": pm.mean(),
-        "pm25_median": pm.median(),
-        "pm25_std": pm.std(),
-        "pm25_min": pm.min(),
-        "pm25_max": pm.max(),
-        "pm25_p5": pm.quantile(0.05),
-        "pm25_p25": pm.quantile(0.25),
-        "pm25_p75": pm.quantile(0.75),
-        "pm25_p95": pm.quantile(0.95),
-        "pm25_skewness": pm.skew(),
-        "pm25_kurtosis": pm.kurtosis(),
-        # WHO exceedance
-        "pct_above_who_aqg": (pm > WHO_AQG_24H).mean() * 100,
-        "pct_above_who_it1": (pm > WHO_IT1_24H).mean() * 100,
-        # Spatial coverage
-        "lat_min": df["lat"].min(),
-        "lat_max": df["lat"].max(),
-        "lon_min": df["lon"].min(),
-        "lon_max": df["lon"].max(),
     }
-
-    # Meteorological summaries
-    for var in MET_VARS:
-        if var in df.columns:
-            result[f"{var}_mean"] = df[var].mean()
-            result[f"{var}_std"] = df[var].std()
-            result[f"{var}_min"] = df[var].min()
-            result[f"{var}_max"] = df[var].max()
+    # PM2.5 statistics and WHO exceedance
+    result.update(_pm_stats(df["pm25"].to_numpy(dtype=float)))
+    # Spatial coverage
+    coords = df[["lat", "lon"]].to_numpy(dtype=float)
+    coord_min = np.nanmin(coords, axis=0)
+    coord_max = np.nanmax(coords, axis=0)
+    result.update({
+        "lat_min": coord_min[0],
+        "lat_max": coord_max[0],
+        "lon_min": coord_min[1],
+        "lon_max": coord_max[1],
+    })
+
+    # Meteorological summaries (one vectorized reduction per statistic)
+    met_present = [v for v in MET_VARS if v in df.columns]
+    if met_present:
+        met = df[met_present].to_numpy(dtype=float)
+        met_mean = np.nanmean(met, axis=0)
+        met_std = np.nanstd(met, axis=0, ddof=1)
+        met_min = np.nanmin(met, axis=0)
+        met_max = np.nanmax(met, axis=0)
+        for i, var in enumerate(met_present):
+            result[f"{var}_mean"] = met_mean[i]
+            result[f"{var}_std"] = met_std[i]
+            result[f"{var}_min"] = met_min[i]
+            result[f"{var}_max"] = met_max[i]
 
     return result
 
 
-def compute_diurnal_pattern(df: pd.DataFrame) -> pd.DataFrame:
+def compute_diurnal_pattern(df: pd.DataFrame, time: dict | None = None) -> pd.DataFrame:
     """Compute hourly PM2.5 averages (0-23)."""
     if df.empty:
         return pd.DataFrame(columns=["hour", "pm25_mean", "pm25_std"])
 
-    df = df.copy()
-    df["hour"] = pd.to_datetime(df["datetime_utc"]).dt.hour
-    pattern = df.groupby("hour")["pm25"].agg(["mean", "std"]).reset_index()
-    pattern.columns = ["hour", "pm25_mean", "pm25_std"]
-    return pattern
+    time = time if time is not None else _prepare_time(df)
+    return _binned_pattern(time["hour"], time["pm25"], 24, "hour")
 
 
-def compute_seasonal_pattern(df: pd.DataFrame) -> pd.DataFrame:
+def compute_seasonal_pattern(df: pd.DataFrame, time: dict | None = None) -> pd.DataFrame:
     """Compute monthly PM2.5 averages (1-12)."""
     if df.empty:
         return pd.DataFrame(columns=["month", "pm25_mean", "pm25_std"])
 
-    df = df.copy()
-    df["month"] = pd.to_datetime(df["datetime_utc"]).dt.month
-    pattern = df.groupby("month")["pm25"].agg(["mean", "std"]).reset_index()
-    pattern.columns = ["month", "pm25_mean", "pm25_std"]
-    return pattern
+    time = time if time is not None else _prepare_time(df)
+    return _binned_pattern(time["month"], time["pm25"], 13, "month")
 
 
-def compute_day_of_week_pattern(df: pd.DataFrame) -> pd.DataFrame:
+def compute_day_of_week_pattern(df: pd.DataFrame, time: dict | None = None) -> pd.DataFrame:
     """Compute day-of-week PM2.5 averages (0=Monday to 6=Sunday)."""
     if df.empty:
         return pd.DataFrame(columns=["day_of_week", "pm25_mean", "pm25_std"])
 
-    df = df.copy()
-    df["day_of_week"] = pd.to_datetime(df["datetime_utc"]).dt.dayofweek
-    pattern = df.groupby("day_of_week")["pm25"].agg(["mean", "std"]).reset_index()
-    pattern.columns = ["day_of_week", "pm25_mean", "pm25_std"]
-    return pattern
+    time = time if time is not None else _prepare_time(df)
+    return _binned_pattern(time["dow"], time["pm25"], 7, "day_of_week")
+
+
+def compute_temporal_patterns(df: pd.DataFrame, time: dict | None = None) -> dict:
+    """
+    Compute diurnal, seasonal and day-of-week patterns together.
+    Timestamps are parsed once and all three aggregations share the
+    same projected PM2.5 and calendar-key arrays.
+    """
+    if df.empty:
+        return {
+            "diurnal": compute_diurnal_pattern(df),
+            "seasonal": compute_seasonal_pattern(df),
+            "day_of_week": compute_day_of_week_pattern(df),
+        }
+
+    time = time if time is not None else _prepare_time(df)
+    return {
+        "diurnal": compute_diurnal_pattern(df, time),
+        "seasonal": compute_seasonal_pattern(df, time),
+        "day_of_week": compute_day_of_week_pattern(df, time),
+    }
 
 
 def compute_correlations(df: pd.DataFrame) -> dict:
@@ -114,25 +126,45 @@ def compute_correlations(df: pd.DataFrame) -> dict:
         return {"pearson": pd.DataFrame(), "spearman": pd.DataFrame()}
 
     cols = ["pm25"] + [v for v in MET_VARS if v in df.columns]
-    subset = df[cols].dropna()
+    X = df[cols].to_numpy(dtype=float)
+    X = X[~np.isnan(X).any(axis=1)]
+
+    # Spearman is Pearson on ranks: rank every column in one call
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pearson = np.corrcoef(X, rowvar=False)
+        spearman = np.corrcoef(scipy_stats.rankdata(X, axis=0), rowvar=False)
 
     return {
-        "pearson": subset.corr(method="pearson"),
-        "spearman": subset.corr(method="spearman"),
+        "pearson": pd.DataFrame(pearson, index=cols, columns=cols),
+        "spearman": pd.DataFrame(spearman, index=cols, columns=cols),
     }
 
 
 def compare_distributions(
-    df_med: pd.DataFrame, df_kan: pd.DataFrame
+    df_med: pd.DataFrame,
+    df_kan: pd.DataFrame,
+    *,
+    patterns_med: dict | None = None,
+    patterns_kan: dict | None = None,
+    corr_med: dict | None = None,
+    corr_kan: dict | None = None,
+    stats_med: dict | None = None,
+    stats_kan: dict | None = None,
 ) -> dict:
     """
     Cross-city statistical comparison.
     Returns dict with test statistics, p-values, and similarity metrics.
+    Temporal patterns (from compute_temporal_patterns), correlations
+    (from compute_correlations) and summary statistics (from
+    compute_summary_statistics) already computed by the caller can be
+    passed in; anything not supplied is computed here.
     """
     result = {}
 
-    med_pm = df_med["pm25"].dropna() if not df_med.empty else pd.Series(dtype=float)
-    kan_pm = df_kan["pm25"].dropna() if not df_kan.empty else pd.Series(dtype=float)
+    med_pm = df_med["pm25"].to_numpy(dtype=float) if not df_med.empty else np.empty(0)
+    kan_pm = df_kan["pm25"].to_numpy(dtype=float) if not df_kan.empty else np.empty(0)
+    med_pm = med_pm[~np.isnan(med_pm)]
+    kan_pm = kan_pm[~np.isnan(kan_pm)]
 
     # Minimum sample size for meaningful tests
     if len(med_pm) < 30 or len(kan_pm) < 30:
@@ -145,66 +177,60 @@ def compare_distributions(
 
     result["insufficient_data"] = False
 
-    # Kolmogorov-Smirnov test
+    # Kolmogorov-Smirnov and Mann-Whitney U tests (shared sort)
     try:
-        ks_stat, ks_p = scipy_stats.ks_2samp(med_pm, kan_pm)
+        ks_stat, ks_p, u_stat, u_p = _ks_and_mannwhitneyu(med_pm, kan_pm)
         result["ks_statistic"] = ks_stat
         result["ks_pvalue"] = ks_p
-    except Exception as e:
-        logger.warning(f"  KS test failed: {e}")
-
-    # Mann-Whitney U test
-    try:
-        u_stat, u_p = scipy_stats.mannwhitneyu(med_pm, kan_pm, alternative="two-sided")
         result["mannwhitney_u"] = u_stat
         result["mannwhitney_pvalue"] = u_p
     except Exception as e:
-        logger.warning(f"  Mann-Whitney test failed: {e}")
+        logger.warning(f"  KS / Mann-Whitney tests failed: {e}")
+
+    # Moments already computed for the summary statistics are reused
+    if not stats_med or "pm25_mean" not in stats_med:
+        stats_med = _pm_stats(med_pm)
+    if not stats_kan or "pm25_mean" not in stats_kan:
+        stats_kan = _pm_stats(kan_pm)
 
     # Cohen's d effect size
+    n_med, n_kan = len(med_pm), len(kan_pm)
     pooled_std = np.sqrt(
-        ((len(med_pm) - 1) * med_pm.std() ** 2 + (len(kan_pm) - 1) * kan_pm.std() ** 2)
-        / (len(med_pm) + len(kan_pm) - 2)
+        ((n_med - 1) * stats_med["pm25_std"] ** 2 + (n_kan - 1) * stats_kan["pm25_std"] ** 2)
+        / (n_med + n_kan - 2)
     )
     if pooled_std > 0:
-        result["cohens_d"] = (med_pm.mean() - kan_pm.mean()) / pooled_std
+        result["cohens_d"] = (stats_med["pm25_mean"] - stats_kan["pm25_mean"]) / pooled_std
     else:
         result["cohens_d"] = 0.0
 
     # Distribution shape
-    result["med_skewness"] = med_pm.skew()
-    result["kan_skewness"] = kan_pm.skew()
-    result["med_kurtosis"] = med_pm.kurtosis()
-    result["kan_kurtosis"] = kan_pm.kurtosis()
-
-    # Diurnal pattern similarity
-    diurnal_med = compute_diurnal_pattern(df_med)
-    diurnal_kan = compute_diurnal_pattern(df_kan)
-    if not diurnal_med.empty and not diurnal_kan.empty and len(diurnal_med) == 24 and len(diurnal_kan) == 24:
-        med_profile = diurnal_med["pm25_mean"].values
-        kan_profile = diurnal_kan["pm25_mean"].values
-        result["diurnal_cosine_similarity"] = _cosine_similarity(med_profile, kan_profile)
-        corr, _ = scipy_stats.pearsonr(med_profile, kan_profile)
-        result["diurnal_pearson_r"] = corr
-
-    # Seasonal pattern similarity
-    seasonal_med = compute_seasonal_pattern(df_med)
-    seasonal_kan = compute_seasonal_pattern(df_kan)
-    if not seasonal_med.empty and not seasonal_kan.empty:
-        # Merge on month to handle cases where not all months have data
-        merged = seasonal_med.merge(seasonal_kan, on="month", suffixes=("_med", "_kan"))
-        if len(merged) >= 3:
-            result["seasonal_cosine_similarity"] = _cosine_similarity(
-                merged["pm25_mean_med"].values, merged["pm25_mean_kan"].values
-            )
-            corr, _ = scipy_stats.pearsonr(
-                merged["pm25_mean_med"].values, merged["pm25_mean_kan"].values
-            )
-            result["seasonal_pearson_r"] = corr
+    result["med_skewness"] = stats_med["pm25_skewness"]
+    result["kan_skewness"] = stats_kan["pm25_skewness"]
+    result["med_kurtosis"] = stats_med["pm25_kurtosis"]
+    result["kan_kurtosis"] = stats_kan["pm25_kurtosis"]
+
+    diurnal_med, seasonal_med = _pattern_profiles(df_med, patterns_med)
+    diurnal_kan, seasonal_kan = _pattern_profiles(df_kan, patterns_kan)
+
+    # Diurnal pattern similarity (requires all 24 hours in both cities)
+    if not np.isnan(diurnal_med).any() and not np.isnan(diurnal_kan).any():
+        result["diurnal_cosine_similarity"] = _cosine_similarity(diurnal_med, diurnal_kan)
+        result["diurnal_pearson_r"] = _pearson_r(diurnal_med, diurnal_kan)
+
+    # Seasonal pattern similarity over months with data in both cities
+    shared = ~np.isnan(seasonal_med) & ~np.isnan(seasonal_kan)
+    if shared.sum() >= 3:
+        seasonal_med = seasonal_med[shared]
+        seasonal_kan = seasonal_kan[shared]
+        result["seasonal_cosine_similarity"] = _cosine_similarity(seasonal_med, seasonal_kan)
+        result["seasonal_pearson_r"] = _pearson_r(seasonal_med, seasonal_kan)
 
     # Meteorological variable correlations comparison
-    corr_med = compute_correlations(df_med)
-    corr_kan = compute_correlations(df_kan)
+    if corr_med is None:
+        corr_med = compute_correlations(df_med)
+    if corr_kan is None:
+        corr_kan = compute_correlations(df_kan)
     if not corr_med["pearson"].empty and not corr_kan["pearson"].empty:
         # Compare PM2.5 correlation patterns with met vars
         common_vars = [
@@ -212,10 +238,9 @@ def compare_distributions(
             if v in corr_med["pearson"].columns and v in corr_kan["pearson"].columns
         ]
         if common_vars:
-            med_corr_vec = [corr_med["pearson"].loc["pm25", v] for v in common_vars]
-            kan_corr_vec = [corr_kan["pearson"].loc["pm25", v] for v in common_vars]
             result["correlation_pattern_similarity"] = _cosine_similarity(
-                np.array(med_corr_vec), np.array(kan_corr_vec)
+                _pm25_corr_vector(corr_med["pearson"], common_vars),
+                _pm25_corr_vector(corr_kan["pearson"], common_vars),
             )
 
     return result
@@ -229,43 +254,45 @@ def generate_report(
     report_path = REPORTS_DIR / "statistical_comparison.txt"
     csv_path = REPORTS_DIR / "statistics_summary.csv"
 
-    lines = []
-    lines.append("=" * 70)
-    lines.append("PM2.5 STATISTICAL ANALYSIS REPORT")
-    lines.append("Twin-City Comparison: Medellin (Colombia) vs Kandy (Sri Lanka)")
-    lines.append("For PINN Transfer Learning Justification")
-    lines.append("=" * 70)
-    lines.append("")
+    lines = [
+        "=" * 70,
+        "PM2.5 STATISTICAL ANALYSIS REPORT",
+        "Twin-City Comparison: Medellin (Colombia) vs Kandy (Sri Lanka)",
+        "For PINN Transfer Learning Justification",
+        "=" * 70,
+        "",
+    ]
 
-    # Per-city summaries
+    # Per-city summaries, one formatted block each
     for label, s in [("MEDELLIN", stats_med), ("KANDY", stats_kan)]:
-        lines.append(f"--- {label} ---")
         if s.get("n_records", 0) == 0:
-            lines.append("  No data available.")
-            lines.append("")
+            lines += [f"--- {label} ---", "  No data available.", ""]
             continue
 
-        lines.append(f"  Records:        {s['n_records']:,}")
-        lines.append(f"  Stations:       {s.get('n_stations', 'N/A')}")
-        lines.append(f"  Date range:     {s.get('date_min', '?')} to {s.get('date_max', '?')}")
-        lines.append(f"  Unique hours:   {s.get('unique_hours', '?'):,}")
-        lines.append(f"  PM2.5 mean:     {s.get('pm25_mean', 0):.2f} ug/m3")
-        lines.append(f"  PM2.5 median:   {s.get('pm25_median', 0):.2f} ug/m3")
-        lines.append(f"  PM2.5 std:      {s.get('pm25_std', 0):.2f} ug/m3")
-        lines.append(f"  PM2.5 range:    [{s.get('pm25_min', 0):.1f}, {s.get('pm25_max', 0):.1f}]")
-        lines.append(f"  PM2.5 IQR:      [{s.get('pm25_p25', 0):.1f}, {s.get('pm25_p75', 0):.1f}]")
-        lines.append(f"  PM2.5 skewness: {s.get('pm25_skewness', 0):.3f}")
-        lines.append(f"  PM2.5 kurtosis: {s.get('pm25_kurtosis', 0):.3f}")
-        lines.append(f"  % above WHO AQG (15):  {s.get('pct_above_who_aqg', 0):.1f}%")
-        lines.append(f"  % above WHO IT-1 (35): {s.get('pct_above_who_it1', 0):.1f}%")
-        lines.append("")
-
-        for var in MET_VARS:
-            mean = s.get(f"{var}_mean")
-            std = s.get(f"{var}_std")
-            if mean is not None:
-                lines.append(f"  {var}: {mean:.2f} +/- {std:.2f}")
-        lines.append("")
+        get = s.get
+        met_lines = "".join(
+            f"  {var}: {mean:.2f} +/- {get(f'{var}_std'):.2f}\n"
+            for var in MET_VARS
+            if (mean := get(f"{var}_mean")) is not None
+        )
+        lines.append(
+            f"--- {label} ---\n"
+            f"  Records:        {s['n_records']:,}\n"
+            f"  Stations:       {get('n_stations', 'N/A')}\n"
+            f"  Date range:     {get('date_min', '?')} to {get('date_max', '?')}\n"
+            f"  Unique hours:   {get('unique_hours', '?'):,}\n"
+            f"  PM2.5 mean:     {get('pm25_mean', 0):.2f} ug/m3\n"
+            f"  PM2.5 median:   {get('pm25_median', 0):.2f} ug/m3\n"
+            f"  PM2.5 std:      {get('pm25_std', 0):.2f} ug/m3\n"
+            f"  PM2.5 range:    [{get('pm25_min', 0):.1f}, {get('pm25_max', 0):.1f}]\n"
+            f"  PM2.5 IQR:      [{get('pm25_p25', 0):.1f}, {get('pm25_p75', 0):.1f}]\n"
+            f"  PM2.5 skewness: {get('pm25_skewness', 0):.3f}\n"
+            f"  PM2.5 kurtosis: {get('pm25_kurtosis', 0):.3f}\n"
+            f"  % above WHO AQG (15):  {get('pct_above_who_aqg', 0):.1f}%\n"
+            f"  % above WHO IT-1 (35): {get('pct_above_who_it1', 0):.1f}%\n"
+            f"\n"
+            f"{met_lines}"
+        )
 
     # Cross-city comparison
     lines.append("--- CROSS-CITY COMPARISON ---")
@@ -322,20 +349,223 @@ def generate_report(
     report_path.write_text(report)
     logger.info(f"  Report saved: {report_path}")
 
-    # Save raw stats as CSV
-    stats_df = pd.DataFrame([stats_med, stats_kan])
-    stats_df.to_csv(csv_path, index=False)
+    # Save raw stats as CSV (two known-shape rows, no DataFrame needed)
+    fieldnames = list(dict.fromkeys([*stats_med, *stats_kan]))
+    with csv_path.open("w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")
+        writer.writeheader()
+        for s in (stats_med, stats_kan):
+            writer.writerow({
+                k: "" if isinstance(v, float) and math.isnan(v) else v
+                for k, v in s.items()
+            })
     logger.info(f"  Statistics CSV saved: {csv_path}")
 
     return report
 
 
+def _prepare_time(df: pd.DataFrame) -> dict:
+    """
+    Parse datetime_utc once and return the PM2.5 values with their
+    hour, month and day-of-week keys as aligned NumPy arrays.
+    Rows with a missing timestamp or PM2.5 value are dropped.
+    """
+    dt = pd.DatetimeIndex(pd.to_datetime(df["datetime_utc"], cache=True, utc=True))
+    pm = df["pm25"].to_numpy(dtype=float)
+    valid = ~(dt.isna() | np.isnan(pm))
+    dt = dt[valid]
+    return {
+        "pm25": pm[valid],
+        "hour": dt.hour.to_numpy(),
+        "month": dt.month.to_numpy(),
+        "dow": dt.dayofweek.to_numpy(),
+    }
+
+
+def _binned_mean(
+    keys: np.ndarray, pm: np.ndarray, minlength: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Per-bin record counts and PM2.5 means via np.bincount (NaN where empty)."""
+    counts = np.bincount(keys, minlength=minlength)
+    sums = np.bincount(keys, weights=pm, minlength=minlength)
+    mean = np.divide(sums, counts, out=np.full(minlength, np.nan), where=counts > 0)
+    return counts, mean
+
+
+def _binned_pattern(
+    keys: np.ndarray, pm: np.ndarray, minlength: int, key_name: str
+) -> pd.DataFrame:
+    """Per-bin PM2.5 mean and sample std as a DataFrame (bins without data omitted)."""
+    counts, mean = _binned_mean(keys, pm, minlength)
+
+    dev = pm - mean[keys]
+    sq = np.bincount(keys, weights=dev * dev, minlength=minlength)
+    std = np.divide(sq, counts - 1, out=np.full(minlength, np.nan), where=counts > 1)
+    std = np.sqrt(std)
+
+    bins = np.flatnonzero(counts)
+    return pd.DataFrame({
+        key_name: bins,
+        "pm25_mean": mean[bins],
+        "pm25_std": std[bins],
+    })
+
+
+def _pattern_profiles(
+    df: pd.DataFrame, patterns: dict | None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Diurnal (index = hour) and seasonal (index = month) PM2.5 mean
+    profiles, NaN where a bin has no data. Uses precomputed patterns
+    when given, otherwise aggregates straight from the timestamps.
+    """
+    if patterns is None:
+        time = _prepare_time(df)
+        return (
+            _binned_mean(time["hour"], time["pm25"], 24)[1],
+            _binned_mean(time["month"], time["pm25"], 13)[1],
+        )
+
+    profiles = []
+    for name, key_name, size in [("diurnal", "hour", 24), ("seasonal", "month", 13)]:
+        pattern = patterns[name]
+        means = np.full(size, np.nan)
+        means[pattern[key_name].to_numpy(dtype=np.intp)] = (
+            pattern["pm25_mean"].to_numpy(dtype=float)
+        )
+        profiles.append(means)
+    return profiles[0], profiles[1]
+
+
+def _pm25_corr_vector(corr: pd.DataFrame, variables: list[str]) -> np.ndarray:
+    """PM2.5 row of a correlation matrix for the given variables, as one slice."""
+    idx = corr.index.get_indexer(["pm25", *variables])
+    return corr.to_numpy()[idx[0], idx[1:]]
+
+
+def _pm_stats(pm: np.ndarray) -> dict:
+    """
+    PM2.5 moments, quantiles and WHO exceedance from a single NumPy array.
+    Matches pandas semantics: NaNs skipped, std with ddof=1, bias-corrected
+    skewness and excess kurtosis.
+    """
+    pm = pm[~np.isnan(pm)]
+    n = pm.size
+    keys = [
+        "pm25_mean", "pm25_median", "pm25_std", "pm25_min", "pm25_max",
+        "pm25_p5", "pm25_p25", "pm25_p75", "pm25_p95",
+        "pm25_skewness", "pm25_kurtosis",
+        "pct_above_who_aqg", "pct_above_who_it1",
+    ]
+    if n == 0:
+        return dict.fromkeys(keys, np.nan)
+
+    # Boolean indexing above made pm a private copy, so it can be partitioned
+    # in place: introselect places only the order statistics we need (the
+    # quantile neighbours plus min/max) instead of fully sorting
+    pos = np.array([0.05, 0.25, 0.5, 0.75, 0.95]) * (n - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, n - 1)
+    pm.partition(np.unique(np.concatenate([lo, hi, [0, n - 1]])))
+    p5, p25, p50, p75, p95 = pm[lo] + (pm[hi] - pm[lo]) * (pos - lo)
+    pm_min, pm_max = pm[0], pm[-1]
+    thresholds = np.array([WHO_AQG_24H, WHO_IT1_24H])
+    exceed = np.count_nonzero(pm > thresholds[:, None], axis=1) / n * 100
+
+    # Central moments: deviations overwrite the same buffer, and the
+    # higher-order products are fused into dot-product reductions
+    mean = pm.mean()
+    d = np.subtract(pm, mean, out=pm)
+    d2 = d * d
+    m2 = d2.sum() / n
+    m3 = (d2 @ d) / n
+    m4 = (d2 @ d2) / n
+
+    std = np.sqrt(m2 * n / (n - 1)) if n > 1 else np.nan
+    if n < 3:
+        skew = np.nan
+    elif m2 == 0:
+        skew = 0.0
+    else:
+        skew = m3 / m2 ** 1.5 * np.sqrt(n * (n - 1)) / (n - 2)
+    if n < 4:
+        kurt = np.nan
+    elif m2 == 0:
+        kurt = 0.0
+    else:
+        g2 = m4 / m2 ** 2 - 3.0
+        kurt = ((n + 1) * g2 + 6.0) * (n - 1) / ((n - 2) * (n - 3))
+
+    return dict(zip(keys, [
+        mean, p50, std, pm_min, pm_max,
+        p5, p25, p75, p95,
+        skew, kurt,
+        exceed[0], exceed[1],
+    ]))
+
+
+def _ks_and_mannwhitneyu(
+    a: np.ndarray, b: np.ndarray
+) -> tuple[float, float, float, float]:
+    """
+    Two-sided KS and Mann-Whitney U tests from one joint sort.
+
+    A single argsort of the merged sample gives both ECDFs at every
+    distinct value (KS statistic) and the tie groups, whose average ranks
+    yield the first sample's rank sum and the tie correction (U test).
+    Returns (D, KS p-value, U of the first sample, Mann-Whitney p-value).
+    The KS p-value uses the asymptotic Smirnov distribution, as scipy's
+    ks_2samp does for samples larger than 10,000; the U p-value uses the
+    tie- and continuity-corrected normal approximation, as mannwhitneyu.
+    """
+    n1, n2 = a.size, b.size
+    n = n1 + n2
+    both = np.concatenate([a, b])
+    order = np.argsort(both)
+    values = both[order]
+
+    # Last sorted position of each run of equal values
+    group_last = np.append(values[1:] != values[:-1], True)
+    ends = np.flatnonzero(group_last) + 1
+    starts = np.concatenate([[0], ends[:-1]])
+    count_a = np.cumsum(order < n1)[group_last]
+
+    # KS: ECDF gap evaluated after each tie group
+    d = float(np.max(np.abs(count_a / n1 - (ends - count_a) / n2)))
+    en = n1 * n2 / (n1 + n2)
+    ks_p = float(np.clip(scipy_stats.kstwo.sf(d, np.round(en)), 0, 1))
+
+    # Mann-Whitney: tied values share the average of their ranks
+    avg_rank = (starts + 1 + ends) / 2
+    a_per_group = np.diff(count_a, prepend=0)
+    u1 = float(avg_rank @ a_per_group) - n1 * (n1 + 1) / 2
+    u = max(u1, n1 * n2 - u1)
+
+    t = (ends - starts).astype(float)
+    tie_term = (t ** 3 - t).sum()
+    sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    if sigma == 0:
+        return d, ks_p, u1, 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / sigma
+    u_p = float(np.clip(2 * special.ndtr(-z), 0, 1))
+    return d, ks_p, u1, u_p
+
+
 def _cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
-    norm_a = np.linalg.norm(a)
-    norm_b = np.linalg.norm(b)
-    if norm_a == 0 or norm_b == 0:
+    denom = math.sqrt(float(a @ a) * float(b @ b))
+    if denom == 0:
         return 0.0
-    return float(np.dot(a, b) / (norm_a * norm_b))
+    return float(a @ b) / denom
+
+
+def _pearson_r(a: np.ndarray, b: np.ndarray) -> float:
+    """Pearson r for short profile vectors (no p-value); NaN if either is constant."""
+    a = a - a.mean()
+    b = b - b.mean()
+    denom = math.sqrt(float(a @ a) * float(b @ b))
+    if denom == 0:
+        return float("nan")
+    return float(a @ b) / denom
 
 
 def _interpret_results(comparison: dict) -> str:
@@ -3,13 +3,18 @@ OpenAQ v3 API client for collecting PM2.5 measurements.
 Handles pagination, rate limiting, and retry logic.
 """
 
+import hashlib
+import json
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from calendar import monthrange
 
 import requests
+from requests.adapters import HTTPAdapter
+import numpy as np
 import pandas as pd
 
 from config import (
@@ -19,6 +24,45 @@ from config import (
 
 logger = logging.getLogger(__name__)
 
+# orjson decodes the large paginated responses several times faster;
+# it is optional, so fall back to the standard library
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# Concurrent (sensor, month) requests; they are latency-bound, and the
+# shared rate limiter still caps the overall request rate
+MAX_WORKERS = 8
+
+# Station lists change rarely; reruns reuse the cached location search
+LOCATIONS_CACHE_TTL = 7 * 86400  # seconds
+
+PM25_NAMES = frozenset(("pm25", "pm2.5"))
+PM25_PARAMETER_ID = 2
+
+RAW_COLUMNS = [
+    "datetime_utc", "datetime_to", "location_id", "location_name",
+    "sensor_id", "lat", "lon", "pm25", "coverage_pct",
+]
+
+# (date_from, date_to) request window per month of YEAR, built once from
+# month-start boundaries; a different freq gives finer request windows
+_MONTH_STARTS = pd.date_range(f"{YEAR}-01-01", periods=13, freq="MS")
+MONTH_RANGES = [
+    (start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+     (end - pd.Timedelta(seconds=1)).strftime("%Y-%m-%dT%H:%M:%SZ"))
+    for start, end in zip(_MONTH_STARTS[:-1], _MONTH_STARTS[1:])
+]
+
+# Narrow dtypes for the raw CSV: float32 holds PM2.5 and coordinates to
+# well beyond their measurement precision, and OpenAQ ids fit in int32
+RAW_DTYPES = {
+    "location_id": "int32", "sensor_id": "int32",
+    "lat": "float32", "lon": "float32",
+    "pm25": "float32", "coverage_pct": "float32",
+}
+
 
 class OpenAQCollector:
     def __init__(self, api_key: str, base_url: str, rate_limit: int):
@@ -28,18 +72,61 @@ class OpenAQCollector:
         self.session.headers.update({
             "X-API-Key": api_key,
             "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
         })
-        self._request_times: list[float] = []
+        # Room for every concurrent fetch thread (MAX_WORKERS per city) to
+        # keep its own connection alive; the default pool holds only 10
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=0)
+        self.session.mount("https://", adapter)
+        # Sliding-window counter, keeping a 2-request margin below the limit
+        self._capacity = max(rate_limit - 2, 1)
+        self._window_start = time.monotonic()
+        self._prev_count = 0
+        self._curr_count = 0
+        self._rate_lock = threading.Lock()
+
+    def close(self) -> None:
+        """Close the shared session and its pooled keep-alive connections."""
+        self.session.close()
+
+    def __enter__(self) -> "OpenAQCollector":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
 
     def _wait_for_rate_limit(self) -> None:
-        """Ensure we don't exceed the per-minute rate limit."""
-        now = time.time()
-        # Remove requests older than 60 seconds
-        self._request_times = [t for t in self._request_times if now - t < 60]
-        if len(self._request_times) >= self.rate_limit - 2:
-            oldest = self._request_times[0]
-            sleep_time = 60 - (now - oldest) + 1
-            if sleep_time > 0:
+        """
+        Ensure we don't exceed the per-minute rate limit.
+
+        Approximates the count over the trailing 60 s as the current
+        window's count plus the previous window's count weighted by its
+        remaining overlap. Thread-safe: callers claim slots under a lock.
+        """
+        with self._rate_lock:
+            while True:
+                now = time.monotonic()
+                elapsed = now - self._window_start
+                if elapsed >= 60:
+                    windows = int(elapsed // 60)
+                    self._prev_count = self._curr_count if windows == 1 else 0
+                    self._curr_count = 0
+                    self._window_start += windows * 60
+                    elapsed -= windows * 60
+
+                weighted = self._prev_count * (1 - elapsed / 60) + self._curr_count
+                if weighted < self._capacity:
+                    self._curr_count += 1
+                    return
+
+                # Sleep until the previous window's share has decayed enough,
+                # or until the next window if the current one is already full
+                if self._curr_count < self._capacity and self._prev_count:
+                    free_at = 60 * (1 - (self._capacity - self._curr_count) / self._prev_count)
+                else:
+                    free_at = 60
+                sleep_time = max(free_at - elapsed, 0.01)
                 logger.debug(f"Rate limit approaching, sleeping {sleep_time:.1f}s")
                 time.sleep(sleep_time)
 
@@ -55,7 +142,6 @@ class OpenAQCollector:
             self._wait_for_rate_limit()
             try:
                 resp = self.session.get(url, params=params, timeout=30)
-                self._request_times.append(time.time())
 
                 # Check rate limit headers
                 remaining = resp.headers.get("x-ratelimit-remaining")
@@ -76,7 +162,7 @@ class OpenAQCollector:
                     continue
 
                 resp.raise_for_status()
-                return resp.json()
+                return json_loads(resp.content)
 
             except requests.exceptions.Timeout:
                 logger.warning(f"Request timeout on attempt {attempt + 1}")
@@ -114,6 +200,31 @@ class OpenAQCollector:
 
         return all_results
 
+    def _cached_locations(self, params: dict) -> list[dict]:
+        """
+        Paginate the locations endpoint, caching the raw results on disk
+        for LOCATIONS_CACHE_TTL so reruns skip identical searches.
+        """
+        key = hashlib.blake2b(
+            json.dumps(params, sort_keys=True).encode(), digest_size=8
+        ).hexdigest()
+        cache_path = RAW_DIR / "openaq" / "_cache" / f"locations_{key}.json"
+
+        if cache_path.exists() and time.time() - cache_path.stat().st_mtime < LOCATIONS_CACHE_TTL:
+            try:
+                locations = json_loads(cache_path.read_bytes())
+                logger.info(f"  Using cached location search ({len(locations)} locations)")
+                return locations
+            except ValueError as e:
+                logger.warning(f"  Ignoring unreadable location cache {cache_path.name}: {e}")
+
+        locations = self._paginate("locations", params)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(locations))
+        tmp_path.replace(cache_path)
+        return locations
+
     def discover_locations(self, lat: float, lon: float, radius: int) -> list[dict]:
         """Find PM2.5 monitoring stations near the given coordinates."""
         params = {
@@ -122,17 +233,12 @@ class OpenAQCollector:
             "limit": OPENAQ_PAGE_LIMIT,
         }
 
-        locations = self._paginate("locations", params)
+        locations = self._cached_locations(params)
 
         # Filter to locations that have PM2.5 sensors
         pm25_locations = []
         for loc in locations:
-            sensors = loc.get("sensors", [])
-            pm25_sensors = [
-                s for s in sensors
-                if s.get("parameter", {}).get("name", "").lower() in ("pm25", "pm2.5")
-                or s.get("parameter", {}).get("id") == 2
-            ]
+            pm25_sensors = _pm25_sensors(loc)
             if pm25_sensors:
                 pm25_locations.append({
                     "location_id": loc.get("id"),
@@ -155,47 +261,66 @@ class OpenAQCollector:
         }
         return self._paginate(f"sensors/{sensor_id}/hours", params)
 
-    def _collect_sensor_year(self, sensor_id: int, location_info: dict) -> list[dict]:
-        """Collect a full year of data for one sensor, month by month."""
-        records = []
-
-        for month in range(1, 13):
-            _, last_day = monthrange(YEAR, month)
-            m_from = f"{YEAR}-{month:02d}-01T00:00:00Z"
-            m_to = f"{YEAR}-{month:02d}-{last_day}T23:59:59Z"
+    def _collect_sensor_month(
+        self, city_key: str, sensor_id: int, location_info: dict, month: int
+    ) -> pd.DataFrame:
+        """
+        Collect one month of hourly data for one sensor.
+        Successful months are checkpointed to a per-sensor CSV shard, so a
+        rerun only requests the months that failed or were never fetched.
+        """
+        shard = RAW_DIR / "openaq" / city_key / str(sensor_id) / f"{YEAR}-{month:02d}.csv"
+        if shard.exists():
+            return pd.read_csv(shard)
 
-            try:
-                measurements = self.get_sensor_measurements(sensor_id, m_from, m_to)
-                for m in measurements:
-                    period = m.get("period", {})
-                    dt_from = period.get("datetimeFrom", {}).get("utc")
-                    dt_to = period.get("datetimeTo", {}).get("utc")
-                    records.append({
-                        "datetime_utc": dt_from,
-                        "datetime_to": dt_to,
-                        "location_id": location_info["location_id"],
-                        "location_name": location_info["name"],
-                        "sensor_id": sensor_id,
-                        "lat": location_info["lat"],
-                        "lon": location_info["lon"],
-                        "pm25": m.get("value"),
-                        "coverage_pct": (
-                            m.get("coverage", {}).get("observedCount", 0)
-                            / max(m.get("coverage", {}).get("expectedCount", 1), 1)
-                            * 100
-                        ) if m.get("coverage", {}).get("expectedCount", 0) else None,
-                    })
+        m_from, m_to = MONTH_RANGES[month - 1]
 
-                logger.debug(
-                    f"  Sensor {sensor_id} month {month:02d}: {len(measurements)} records"
-                )
+        try:
+            measurements = self.get_sensor_measurements(sensor_id, m_from, m_to)
+
+            # Gather per-column lists; station fields are broadcast scalars
+            dt_from, dt_to, values, observed, expected = [], [], [], [], []
+            for m in measurements:
+                period = m.get("period", {})
+                coverage = m.get("coverage", {})
+                dt_from.append(period.get("datetimeFrom", {}).get("utc"))
+                dt_to.append(period.get("datetimeTo", {}).get("utc"))
+                values.append(m.get("value"))
+                observed.append(coverage.get("observedCount", 0))
+                expected.append(coverage.get("expectedCount", 0))
+
+            observed = np.asarray(observed, dtype=float)
+            expected = np.asarray(expected, dtype=float)
+            df = pd.DataFrame({
+                "datetime_utc": dt_from,
+                "datetime_to": dt_to,
+                "location_id": location_info["location_id"],
+                "location_name": location_info["name"],
+                "sensor_id": sensor_id,
+                "lat": location_info["lat"],
+                "lon": location_info["lon"],
+                "pm25": np.asarray(values, dtype=float),
+                "coverage_pct": np.where(
+                    expected != 0, observed / np.maximum(expected, 1) * 100, np.nan
+                ),
+            }, columns=RAW_COLUMNS)
+
+            logger.debug(
+                f"  Sensor {sensor_id} month {month:02d}: {len(measurements)} records"
+            )
 
-            except Exception as e:
-                logger.warning(
-                    f"  Failed to collect sensor {sensor_id} month {month:02d}: {e}"
-                )
+            # Write then rename, so an interrupted run never leaves a partial shard
+            shard.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = shard.with_suffix(".tmp")
+            df.to_csv(tmp_path, index=False)
+            tmp_path.replace(shard)
+            return df
 
-        return records
+        except Exception as e:
+            logger.warning(
+                f"  Failed to collect sensor {sensor_id} month {month:02d}: {e}"
+            )
+            return pd.DataFrame(columns=RAW_COLUMNS)
 
     def collect_city(self, city_key: str, city_config: dict) -> pd.DataFrame:
         """
@@ -231,45 +356,84 @@ class OpenAQCollector:
                 f"  No PM2.5 data available for {city_config['name']}. "
                 f"Creating empty dataset."
             )
-            df = pd.DataFrame(columns=[
-                "datetime_utc", "datetime_to", "location_id", "location_name",
-                "sensor_id", "lat", "lon", "pm25", "coverage_pct",
-            ])
+            df = pd.DataFrame(columns=RAW_COLUMNS)
             df.to_csv(output_path, index=False)
             return df
 
-        # Collect measurements from all stations
-        all_records = []
-        for i, loc in enumerate(locations):
-            logger.info(
-                f"  Station {i + 1}/{len(locations)}: {loc['name']} "
-                f"({loc['lat']:.4f}, {loc['lon']:.4f})"
-            )
-            for sensor in loc["sensors"]:
-                sid = sensor.get("id")
-                if sid is None:
-                    continue
-                records = self._collect_sensor_year(sid, loc)
-                all_records.extend(records)
-                logger.info(f"    Sensor {sid}: {len(records)} hourly records")
+        # Collect measurements from all stations: every (sensor, month) is
+        # requested concurrently, then gathered back in station order
+        frames = []
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            pending = [
+                [
+                    (sid, [
+                        executor.submit(self._collect_sensor_month, city_key, sid, loc, month)
+                        for month in range(1, 13)
+                    ])
+                    for sid in (sensor.get("id") for sensor in loc["sensors"])
+                    if sid is not None
+                ]
+                for loc in locations
+            ]
+            for i, (loc, sensors) in enumerate(zip(locations, pending)):
+                logger.info(
+                    f"  Station {i + 1}/{len(locations)}: {loc['name']} "
+                    f"({loc['lat']:.4f}, {loc['lon']:.4f})"
+                )
+                for sid, futures in sensors:
+                    months = [f.result() for f in futures]
+                    frames.extend(m for m in months if not m.empty)
+                    n_records = sum(len(m) for m in months)
+                    logger.info(f"    Sensor {sid}: {n_records} hourly records")
 
-        df = pd.DataFrame(all_records)
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
         if not df.empty:
+            # Locations listed without an id cannot be cast to int32 (or
+            # keyed downstream), so their records are dropped
+            n_no_id = int(df["location_id"].isna().sum())
+            if n_no_id:
+                logger.warning(
+                    f"  {city_config['name']}: dropping {n_no_id} records "
+                    f"from locations without an id"
+                )
+                df = df.dropna(subset=["location_id"])
+        if not df.empty:
+            df = df.astype(RAW_DTYPES)
             df.to_csv(output_path, index=False)
             logger.info(
                 f"  {city_config['name']}: {len(df)} total records from "
                 f"{df['location_id'].nunique()} stations saved to {output_path}"
             )
         else:
-            df = pd.DataFrame(columns=[
-                "datetime_utc", "datetime_to", "location_id", "location_name",
-                "sensor_id", "lat", "lon", "pm25", "coverage_pct",
-            ])
+            df = pd.DataFrame(columns=RAW_COLUMNS)
             df.to_csv(output_path, index=False)
             logger.warning(f"  {city_config['name']}: No measurements collected")
 
         return df
 
+    def collect_all(self, cities: dict | None = None) -> dict[str, pd.DataFrame]:
+        """
+        Collect PM2.5 for specified cities (defaults to all) concurrently.
+        Cities share this collector's session and rate limiter, since the
+        API limit applies per key. A failed city yields an empty DataFrame.
+        """
+        if cities is None:
+            cities = CITIES
+        if not cities:
+            return {}
+
+        def collect(item: tuple[str, dict]) -> pd.DataFrame:
+            city_key, city_cfg = item
+            logger.info(f"  Collecting PM2.5 for {city_cfg['name']}...")
+            try:
+                return self.collect_city(city_key, city_cfg)
+            except Exception as e:
+                logger.error(f"  PM2.5 collection failed for {city_cfg['name']}: {e}")
+                return pd.DataFrame()
+
+        with ThreadPoolExecutor(max_workers=len(cities)) as executor:
+            return dict(zip(cities, executor.map(collect, cities.items())))
+
     def _search_by_country(self, city_config: dict) -> list[dict]:
         """Fallback: search for PM2.5 stations by country code."""
         try:
@@ -277,40 +441,31 @@ class OpenAQCollector:
                 "countries": city_config["country"],
                 "limit": OPENAQ_PAGE_LIMIT,
             }
-            locations = self._paginate("locations", params)
-
-            # Filter to locations near the target city (within ~50km)
-            city_lat = city_config["lat"]
-            city_lon = city_config["lon"]
+            locations = self._cached_locations(params)
+
+            # Filter to locations near the target city (within 50km), with
+            # one vectorized haversine pass; missing coordinates are NaN
+            coords = np.array([
+                (c.get("latitude"), c.get("longitude"))
+                for c in (loc.get("coordinates") or {} for loc in locations)
+            ], dtype=float).reshape(-1, 2)
+            with np.errstate(invalid="ignore"):
+                dist = _haversine_km(
+                    city_config["lat"], city_config["lon"], coords[:, 0], coords[:, 1]
+                )
             nearby = []
 
-            for loc in locations:
-                loc_lat = loc.get("coordinates", {}).get("latitude")
-                loc_lon = loc.get("coordinates", {}).get("longitude")
-                if loc_lat is None or loc_lon is None:
-                    continue
-
-                # Approximate distance in km
-                dlat = abs(loc_lat - city_lat) * 111
-                dlon = abs(loc_lon - city_lon) * 111 * 0.85  # cos correction
-                dist = (dlat**2 + dlon**2) ** 0.5
-
-                if dist < 50:
-                    sensors = loc.get("sensors", [])
-                    pm25_sensors = [
-                        s for s in sensors
-                        if s.get("parameter", {}).get("name", "").lower()
-                        in ("pm25", "pm2.5")
-                        or s.get("parameter", {}).get("id") == 2
-                    ]
-                    if pm25_sensors:
-                        nearby.append({
-                            "location_id": loc.get("id"),
-                            "name": loc.get("name", "Unknown"),
-                            "lat": loc_lat,
-                            "lon": loc_lon,
-                            "sensors": pm25_sensors,
-                        })
+            for i in np.flatnonzero(dist < 50):
+                loc = locations[i]
+                pm25_sensors = _pm25_sensors(loc)
+                if pm25_sensors:
+                    nearby.append({
+                        "location_id": loc.get("id"),
+                        "name": loc.get("name", "Unknown"),
+                        "lat": float(coords[i, 0]),
+                        "lon": float(coords[i, 1]),
+                        "sensors": pm25_sensors,
+                    })
 
             logger.info(f"  Country search found {len(nearby)} nearby PM2.5 stations")
             return nearby
@@ -318,3 +473,25 @@ class OpenAQCollector:
         except Exception as e:
             logger.warning(f"  Country search failed: {e}")
             return []
+
+
+def _is_pm25(sensor: dict) -> bool:
+    parameter = sensor.get("parameter") or {}
+    name = parameter.get("name")
+    return (name is not None and name.lower() in PM25_NAMES) or (
+        parameter.get("id") == PM25_PARAMETER_ID
+    )
+
+
+def _pm25_sensors(location: dict) -> list[dict]:
+    """PM2.5 sensors of an OpenAQ location record."""
+    return [s for s in location.get("sensors", []) if _is_pm25(s)]
+
+
+def _haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from one point to arrays of points."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * 6371.0 * np.arcsin(np.sqrt(a))
@@ -106,10 +106,14 @@ FIGURES_DIR = OUTPUT_DIR / "figures"
 REPORTS_DIR = OUTPUT_DIR / "reports"
 LOGS_DIR = OUTPUT_DIR / "logs"
 
-# Create directories if they don't exist
-for directory in [OPENAQ_DIR, ERA5_DIR, CAMS_DIR, PROCESSED_DIR, FINAL_DIR,
-                   FIGURES_DIR, REPORTS_DIR, LOGS_DIR]:
-    directory.mkdir(parents=True, exist_ok=True)
+_DIRS = [OPENAQ_DIR, ERA5_DIR, CAMS_DIR, PROCESSED_DIR, FINAL_DIR,
+         FIGURES_DIR, REPORTS_DIR, LOGS_DIR]
+
+
+def ensure_dirs():
+    """Create directories if they don't exist (call once at program entry)."""
+    for directory in _DIRS:
+        directory.mkdir(parents=True, exist_ok=True)
 
 # =============================================================================
 # LOGGING CONFIGURATION
@@ -5,6 +5,7 @@ Combine multiple PM2.5 data sources (SIATA + OpenAQ) for Medellin.
 import logging
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 logger = logging.getLogger(__name__)
@@ -30,27 +31,33 @@ def combine_pm25_sources(
     """
     logger.info("Combining PM2.5 data sources...")
 
-    # Load both datasets
-    df_siata = pd.read_csv(siata_path)
-    df_openaq = pd.read_csv(openaq_path)
+    # Load both datasets, parsing timestamps as ISO 8601 while reading
+    read_opts = dict(parse_dates=["datetime_utc"], date_format="ISO8601")
+    df_siata = pd.read_csv(siata_path, **read_opts)
+    siata_start = df_siata['datetime_utc'].min()
+    siata_end = df_siata['datetime_utc'].max()
+
+    if prefer_source == "siata":
+        # Only OpenAQ rows outside the SIATA period can survive, so filter
+        # while streaming instead of holding the whole file in memory
+        df_openaq, n_openaq, openaq_stations, openaq_start, openaq_end = _read_outside(
+            openaq_path, siata_start, siata_end, read_opts
+        )
+    else:
+        df_openaq = pd.read_csv(openaq_path, **read_opts)
+        n_openaq = len(df_openaq)
+        openaq_stations = df_openaq['location_id'].nunique()
+        openaq_start = df_openaq['datetime_utc'].min()
+        openaq_end = df_openaq['datetime_utc'].max()
 
     logger.info(f"  SIATA: {len(df_siata):,} records from {df_siata['location_id'].nunique()} stations")
-    logger.info(f"  OpenAQ: {len(df_openaq):,} records from {df_openaq['location_id'].nunique()} stations")
+    logger.info(f"  OpenAQ: {n_openaq:,} records from {openaq_stations} stations")
 
     # Add source column
     df_siata['source'] = 'SIATA'
     df_openaq['source'] = 'OpenAQ'
 
-    # Parse datetime
-    df_siata['datetime_utc'] = pd.to_datetime(df_siata['datetime_utc'])
-    df_openaq['datetime_utc'] = pd.to_datetime(df_openaq['datetime_utc'])
-
     # Find overlapping date range
-    siata_start = df_siata['datetime_utc'].min()
-    siata_end = df_siata['datetime_utc'].max()
-    openaq_start = df_openaq['datetime_utc'].min()
-    openaq_end = df_openaq['datetime_utc'].max()
-
     logger.info(f"  SIATA date range: {siata_start} to {siata_end}")
     logger.info(f"  OpenAQ date range: {openaq_start} to {openaq_end}")
 
@@ -87,13 +94,51 @@ def combine_pm25_sources(
     logger.info(f"  Date range: {df_combined['datetime_utc'].min()} to {df_combined['datetime_utc'].max()}")
     logger.info(f"  Total stations: {df_combined['location_id'].nunique()}")
 
-    # Save
-    df_combined.to_csv(output_path, index=False)
+    # Save; timestamps are pre-formatted in one vectorized pass, since
+    # to_csv formats tz-aware datetimes element by element
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    df_combined.assign(
+        datetime_utc=utc_strings(df_combined['datetime_utc'])
+    ).to_csv(output_path, index=False)
     logger.info(f"  Saved to: {output_path}")
 
     return df_combined
 
 
+def _read_outside(
+    path: Path, start: pd.Timestamp, end: pd.Timestamp, read_opts: dict,
+    chunksize: int = 200_000,
+) -> tuple[pd.DataFrame, int, int, pd.Timestamp, pd.Timestamp]:
+    """
+    Read a PM2.5 CSV in chunks, keeping only rows outside [start, end].
+    Also returns the row count, station count and time range of the full file.
+    """
+    kept, starts, ends = [], [], []
+    n_rows = 0
+    stations = set()
+    for chunk in pd.read_csv(path, chunksize=chunksize, **read_opts):
+        times = chunk['datetime_utc']
+        n_rows += len(chunk)
+        stations.update(chunk['location_id'].unique())
+        starts.append(times.min())
+        ends.append(times.max())
+        kept.append(chunk[(times > end) | (times < start)])
+    return pd.concat(kept, ignore_index=True), n_rows, len(stations), min(starts), max(ends)
+
+
+def utc_strings(times: pd.Series) -> np.ndarray:
+    """
+    Format UTC timestamps as 'YYYY-MM-DD HH:MM:SS+00:00' (NaT -> ''), the
+    text pandas writes for them, in one vectorized pass. Shared by every
+    CSV writer with tz-aware times (also preprocessing.merger).
+    """
+    values = times.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy()
+    text = np.char.add(
+        np.char.replace(np.datetime_as_string(values, unit="s"), "T", " "), "+00:00"
+    )
+    return np.where(np.isnat(values), "", text)
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format="%(message)s")
 
@@ -6,10 +6,17 @@ import json
 import logging
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# Optional faster JSON decoder, as in collectors.openaq_collector
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 
 def convert_siata_json_to_csv(json_path: Path, output_path: Path) -> pd.DataFrame:
     """
@@ -38,32 +45,43 @@ def convert_siata_json_to_csv(json_path: Path, output_path: Path) -> pd.DataFram
     """
     logger.info(f"Converting SIATA JSON: {json_path}")
 
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    with open(json_path, 'rb') as f:
+        data = json_loads(f.read())
 
-    records = []
+    # Gather flat columns; per-station scalars are repeated once at the end
+    fechas, valores, calidades, counts = [], [], [], []
     for station in data:
-        station_id = station['codigoSerial']
-        lat = station.get('latitud', None)
-        lon = station.get('longitud', None)  # May not exist in JSON
-
-        for measurement in station['datos']:
-            # Convert datetime format
-            timestamp = pd.to_datetime(measurement['fecha'])
-            timestamp_utc = timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp
-
-            records.append({
-                'datetime_utc': timestamp_utc.isoformat(),
-                'location_id': station_id,
-                'location_name': f"SIATA-{station_id}",
-                'sensor_id': station_id,
-                'lat': lat,
-                'lon': lon,
-                'pm25': float(measurement['valor']),
-                'coverage_pct': 100.0 if float(measurement.get('calidad', 1.0)) == 1.0 else 75.0
-            })
-
-    df = pd.DataFrame(records)
+        datos = station['datos']
+        fechas.extend(m['fecha'] for m in datos)
+        valores.extend(m['valor'] for m in datos)
+        calidades.extend(m.get('calidad', 1.0) for m in datos)
+        counts.append(len(datos))
+
+    station_ids = np.repeat([station['codigoSerial'] for station in data], counts)
+    lats = pd.Series([station.get('latitud') for station in data], dtype=float)
+    lons = pd.Series([station.get('longitud') for station in data], dtype=float)  # May not exist in JSON
+    calidad = np.asarray(calidades, dtype=float)
+
+    # One vectorized parse; naive SIATA timestamps are taken as UTC
+    timestamps = pd.to_datetime(pd.Series(fechas, dtype=object), utc=True)
+
+    df = pd.DataFrame({
+        'datetime_utc': timestamps.dt.strftime('%Y-%m-%dT%H:%M:%S+00:00'),
+        'location_id': station_ids,
+        'location_name': 'SIATA-' + pd.Series(station_ids).astype(str),
+        'sensor_id': station_ids,
+        'lat': np.repeat(lats.to_numpy(), counts),
+        'lon': np.repeat(lons.to_numpy(), counts),
+        'pm25': np.asarray(valores, dtype=float),
+        'coverage_pct': np.where(calidad == 1.0, 100.0, 75.0),
+    })
+
+    # Same narrow dtypes as the OpenAQ raw CSV (collectors.openaq_collector)
+    df = df.astype({
+        'location_id': 'int32', 'sensor_id': 'int32',
+        'lat': 'float32', 'lon': 'float32',
+        'pm25': 'float32', 'coverage_pct': 'float32',
+    })
 
     # Sort by datetime and location
     df = df.sort_values(['datetime_utc', 'location_id']).reset_index(drop=True)
@@ -72,6 +90,7 @@ def convert_siata_json_to_csv(json_path: Path, output_path: Path) -> pd.DataFram
     logger.info(f"  Date range: {df['datetime_utc'].min()} to {df['datetime_utc'].max()}")
 
     # Save to CSV
+    output_path.parent.mkdir(parents=True, exist_ok=True)
     df.to_csv(output_path, index=False)
     logger.info(f"  Saved to: {output_path}")
 
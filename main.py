@@ -10,9 +10,13 @@ Usage:
     python main.py --city medellin  # Run only for Medellin
 """
 
+import os
 import sys
+import pickle
 import argparse
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
 
@@ -25,11 +29,12 @@ from config import (
 )
 
 
-def setup_logging() -> None:
-    """Configure logging to console and timestamped file."""
+def setup_logging(log_file: Path | None = None) -> Path:
+    """Configure logging to console and timestamped file. Returns the log file."""
     LOG_DIR.mkdir(parents=True, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = LOG_DIR / f"pipeline_{timestamp}.log"
+    if log_file is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        log_file = LOG_DIR / f"pipeline_{timestamp}.log"
 
     handlers = [
         logging.StreamHandler(sys.stdout),
@@ -44,6 +49,13 @@ def setup_logging() -> None:
     )
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     logging.getLogger("cdsapi").setLevel(logging.WARNING)
+    return log_file
+
+
+def _init_worker(log_file: Path) -> None:
+    """Attach spawned worker processes to the parent's log (forked ones inherit it)."""
+    if not logging.getLogger().handlers:
+        setup_logging(log_file)
 
 
 def ensure_directories() -> None:
@@ -55,6 +67,12 @@ def ensure_directories() -> None:
     ]:
         d.mkdir(parents=True, exist_ok=True)
 
+    # Configs copied from the current template no longer create their
+    # directories on import; older copies still do and lack this hook
+    import config
+    if hasattr(config, "ensure_dirs"):
+        config.ensure_dirs()
+
 
 def clear_outputs() -> None:
     """Remove all intermediate and output files (for --force mode)."""
@@ -69,31 +87,36 @@ def clear_outputs() -> None:
 def validate_final_dataset(csv_path: Path) -> bool:
     """Validate a final dataset for PINN readiness."""
     logger = logging.getLogger(__name__)
+    required_cols = [
+        "datetime_utc", "pm25", "wind_speed",
+        "temperature_2m", "relative_humidity",
+        "boundary_layer_height", "surface_pressure",
+    ]
+    # Only the checked columns are parsed; timestamps stay as text
+    needed = set(required_cols) | {"city", "location_id"}
     try:
-        df = pd.read_csv(csv_path)
+        df = pd.read_csv(
+            csv_path,
+            usecols=lambda c: c in needed,
+            dtype={"pm25": "float32", "city": "category"},
+        )
         if df.empty:
             logger.warning(f"  Validation: {csv_path.name} is empty")
             return False
 
-        required_cols = [
-            "datetime_utc", "pm25", "wind_speed",
-            "temperature_2m", "relative_humidity",
-            "boundary_layer_height", "surface_pressure",
-        ]
         missing = [c for c in required_cols if c not in df.columns]
         if missing:
             logger.error(f"  Validation FAILED: Missing columns: {missing}")
             return False
 
-        # Check for NaN in critical columns
-        for col in required_cols:
-            nan_count = df[col].isna().sum()
-            if nan_count > 0:
-                logger.warning(f"  {csv_path.name}: {col} has {nan_count} NaN values")
+        # Check for NaN in critical columns, counted in one pass
+        nan_counts = df[required_cols].isna().sum()
+        for col, nan_count in nan_counts[nan_counts > 0].items():
+            logger.warning(f"  {csv_path.name}: {col} has {nan_count} NaN values")
 
         # Check PM2.5 range
-        if (df["pm25"] <= 0).any():
-            bad = (df["pm25"] <= 0).sum()
+        bad = int((df["pm25"].to_numpy() <= 0).sum())
+        if bad:
             logger.warning(f"  {csv_path.name}: {bad} non-positive PM2.5 values")
 
         logger.info(
@@ -109,6 +132,44 @@ def validate_final_dataset(csv_path: Path) -> bool:
         return False
 
 
+def process_city(city_key: str, era5_file: Path | None) -> pd.DataFrame:
+    """Phase 2 for one city: clean PM2.5, process ERA5, merge. Returns the merged data."""
+    logger = logging.getLogger(__name__)
+
+    from preprocessing.pm25_cleaner import clean_pm25
+    from preprocessing.era5_processor import process_era5
+    from preprocessing.merger import merge_pm25_era5
+
+    logger.info(f"  Processing {CITIES[city_key]['name']}...")
+
+    # 2a: Clean PM2.5
+    # Check for combined dataset first (e.g., SIATA + OpenAQ), fall back to OpenAQ only
+    combined_path = RAW_DIR / "openaq" / f"{city_key}_combined_pm25_raw.csv"
+    raw_path = RAW_DIR / "openaq" / f"{city_key}_pm25_raw.csv"
+
+    if combined_path.exists():
+        logger.info(f"    Using combined PM2.5 data: {combined_path.name}")
+        pm25_clean = clean_pm25(combined_path, city_key)
+    elif raw_path.exists():
+        pm25_clean = clean_pm25(raw_path, city_key)
+    else:
+        logger.warning(f"  No raw PM2.5 file for {city_key}")
+        pm25_clean = pd.DataFrame()
+
+    # 2b: Process ERA5
+    if era5_file is not None:
+        era5_processed = process_era5(era5_file, city_key)
+    else:
+        logger.warning(f"  No ERA5 file for {city_key}")
+        era5_processed = pd.DataFrame()
+
+    # 2c: Merge
+    if not pm25_clean.empty and not era5_processed.empty:
+        return merge_pm25_era5(pm25_clean, era5_processed, city_key)
+    logger.warning(f"  Cannot merge {city_key}: missing PM2.5 or ERA5 data")
+    return pd.DataFrame()
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="PM2.5 PINN Data Pipeline")
     parser.add_argument(
@@ -121,7 +182,7 @@ def main() -> None:
     )
     args = parser.parse_args()
 
-    setup_logging()
+    log_file = setup_logging()
     ensure_directories()
     logger = logging.getLogger(__name__)
 
@@ -169,16 +230,10 @@ def main() -> None:
     # 1a: OpenAQ PM2.5
     from collectors.openaq_collector import OpenAQCollector
 
-    openaq = OpenAQCollector(OPENAQ_API_KEY, OPENAQ_BASE_URL, OPENAQ_RATE_LIMIT)
-    pm25_raw = {}
-    for city_key, city_cfg in run_cities.items():
-        logger.info(f"  Collecting PM2.5 for {city_cfg['name']}...")
-        try:
-            pm25_raw[city_key] = openaq.collect_city(city_key, city_cfg)
-            logger.info(f"  -> {len(pm25_raw[city_key]):,} measurements collected")
-        except Exception as e:
-            logger.error(f"  PM2.5 collection failed for {city_cfg['name']}: {e}")
-            pm25_raw[city_key] = pd.DataFrame()
+    with OpenAQCollector(OPENAQ_API_KEY, OPENAQ_BASE_URL, OPENAQ_RATE_LIMIT) as openaq:
+        pm25_raw = openaq.collect_all(run_cities)
+    for city_key, df in pm25_raw.items():
+        logger.info(f"  -> {run_cities[city_key]['name']}: {len(df):,} measurements collected")
 
     # 1b: ERA5 meteorological
     from collectors.era5_collector import ERA5Collector
@@ -199,46 +254,33 @@ def main() -> None:
     logger.info("")
     logger.info("Phase 2: Preprocessing...")
 
-    from preprocessing.pm25_cleaner import clean_pm25
-    from preprocessing.era5_processor import process_era5
-    from preprocessing.merger import merge_pm25_era5, create_combined_dataset
+    from preprocessing.merger import create_combined_dataset
 
-    pm25_clean = {}
-    era5_processed = {}
+    # Cities are independent and CPU-bound, so each gets its own process
     merged = {}
-
-    for city_key in run_cities:
-        logger.info(f"  Processing {run_cities[city_key]['name']}...")
-
-        # 2a: Clean PM2.5
-        # Check for combined dataset first (e.g., SIATA + OpenAQ), fall back to OpenAQ only
-        combined_path = RAW_DIR / "openaq" / f"{city_key}_combined_pm25_raw.csv"
-        raw_path = RAW_DIR / "openaq" / f"{city_key}_pm25_raw.csv"
-
-        if combined_path.exists():
-            logger.info(f"    Using combined PM2.5 data: {combined_path.name}")
-            pm25_clean[city_key] = clean_pm25(combined_path, city_key)
-        elif raw_path.exists():
-            pm25_clean[city_key] = clean_pm25(raw_path, city_key)
-        else:
-            logger.warning(f"  No raw PM2.5 file for {city_key}")
-            pm25_clean[city_key] = pd.DataFrame()
-
-        # 2b: Process ERA5
-        if city_key in era5_files:
-            era5_processed[city_key] = process_era5(era5_files[city_key], city_key)
-        else:
-            logger.warning(f"  No ERA5 file for {city_key}")
-            era5_processed[city_key] = pd.DataFrame()
-
-        # 2c: Merge
-        if not pm25_clean[city_key].empty and not era5_processed[city_key].empty:
-            merged[city_key] = merge_pm25_era5(
-                pm25_clean[city_key], era5_processed[city_key], city_key
-            )
-        else:
-            logger.warning(f"  Cannot merge {city_key}: missing PM2.5 or ERA5 data")
-            merged[city_key] = pd.DataFrame()
+    workers = min(len(run_cities), os.cpu_count() or 1)
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(log_file,),
+            ) as executor:
+                futures = {
+                    city_key: executor.submit(process_city, city_key, era5_files.get(city_key))
+                    for city_key in run_cities
+                }
+                merged = {city_key: f.result() for city_key, f in futures.items()}
+        except (BrokenProcessPool, pickle.PicklingError) as e:
+            # Only pool failures fall back; errors raised by process_city
+            # itself propagate, as in the serial loop
+            logger.warning(f"  Parallel preprocessing failed ({e}), processing serially")
+            workers = 1
+
+    if workers == 1:
+        # Completed stages are checkpointed, so a retry only redoes the rest
+        merged = {
+            city_key: process_city(city_key, era5_files.get(city_key))
+            for city_key in run_cities
+        }
 
     # Combined dataset
     create_combined_dataset(merged)
@@ -253,17 +295,29 @@ def main() -> None:
 
     from analysis.statistics import (
         compute_summary_statistics,
+        compute_temporal_patterns,
+        compute_correlations,
         compare_distributions,
         generate_report,
     )
 
     stats = {}
+    patterns = {}
+    correlations = {}
     for city_key in run_cities:
         stats[city_key] = compute_summary_statistics(merged[city_key], city_key)
+        patterns[city_key] = compute_temporal_patterns(merged[city_key])
+        correlations[city_key] = compute_correlations(merged[city_key])
 
     comparison = compare_distributions(
         merged.get("medellin", pd.DataFrame()),
         merged.get("kandy", pd.DataFrame()),
+        patterns_med=patterns.get("medellin"),
+        patterns_kan=patterns.get("kandy"),
+        corr_med=correlations.get("medellin"),
+        corr_kan=correlations.get("kandy"),
+        stats_med=stats.get("medellin"),
+        stats_kan=stats.get("kandy"),
     )
     report = generate_report(
         stats.get("medellin", {}),
@@ -318,10 +372,11 @@ def main() -> None:
     logger.info(f"  Reports:           {REPORTS_DIR}")
     logger.info(f"  Logs:              {LOG_DIR}")
 
-    # Print dataset sizes
-    for f in sorted(FINAL_DIR.glob("*.csv")):
-        df = pd.read_csv(f)
-        logger.info(f"  {f.name}: {len(df):,} records")
+    # Print dataset sizes from the merged frames already in memory
+    for city_key in run_cities:
+        logger.info(f"  {city_key}_pinn_dataset.csv: {len(merged[city_key]):,} records")
+    n_combined = sum(len(df) for df in merged.values())
+    logger.info(f"  combined_pinn_dataset.csv: {n_combined:,} records")
 
     logger.info(f"Finished at {datetime.now()}")
 
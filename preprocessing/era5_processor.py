@@ -15,6 +15,9 @@ from config import PROCESSED_DIR, YEAR
 
 logger = logging.getLogger(__name__)
 
+# ERA5 short names read by process_era5; anything else in the file is skipped
+ERA5_SHORT_NAMES = ["u10", "v10", "t2m", "d2m", "blh", "sp"]
+
 
 def process_era5(nc_path: Path, city_key: str) -> pd.DataFrame:
     """
@@ -23,11 +26,12 @@ def process_era5(nc_path: Path, city_key: str) -> pd.DataFrame:
     Returns DataFrame with one row per hour.
     """
     output_path = PROCESSED_DIR / f"{city_key}_era5_processed.csv"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
 
     # Checkpointing
     if output_path.exists() and output_path.stat().st_size > 1000:
         logger.info(f"  Skipping {city_key} ERA5 processing (file exists)")
-        return pd.read_csv(output_path, parse_dates=["datetime_utc"])
+        return pd.read_csv(output_path, parse_dates=["datetime_utc"], date_format="ISO8601")
 
     logger.info(f"  Processing ERA5: {nc_path}")
     ds = xr.open_dataset(str(nc_path))
@@ -44,33 +48,35 @@ def process_era5(nc_path: Path, city_key: str) -> pd.DataFrame:
             f"{ds.dims.get('longitude', '?')} lon points"
         )
 
-    # Spatial average across all grid points
+    # Spatial average across all grid points, reading only the needed
+    # variables and loading the result in one pass
     spatial_dims = [d for d in ds.dims if d in ("latitude", "longitude")]
+    ds_avg = ds[ERA5_SHORT_NAMES]
     if spatial_dims:
-        ds_avg = ds.mean(dim=spatial_dims)
-    else:
-        ds_avg = ds
+        ds_avg = ds_avg.mean(dim=spatial_dims)
+    ds_avg = ds_avg.load()
 
-    # Extract variables and convert units
+    # Extract variables and convert units; float32 is ERA5's native
+    # precision, and NumPy keeps the arithmetic below in float32
     time = pd.DatetimeIndex(ds_avg[time_dim].values).tz_localize("UTC")
 
     # U and V wind components (m/s) - already in correct units
-    u_wind = ds_avg["u10"].values.astype(float)
-    v_wind = ds_avg["v10"].values.astype(float)
+    u_wind = ds_avg["u10"].values.astype(np.float32)
+    v_wind = ds_avg["v10"].values.astype(np.float32)
 
     # Temperature: Kelvin -> Celsius
-    temp_k = ds_avg["t2m"].values.astype(float)
+    temp_k = ds_avg["t2m"].values.astype(np.float32)
     temp_c = temp_k - 273.15
 
     # Dewpoint temperature: Kelvin -> Celsius
-    dewpoint_k = ds_avg["d2m"].values.astype(float)
+    dewpoint_k = ds_avg["d2m"].values.astype(np.float32)
     dewpoint_c = dewpoint_k - 273.15
 
     # Boundary layer height (m) - already in correct units
-    blh = ds_avg["blh"].values.astype(float)
+    blh = ds_avg["blh"].values.astype(np.float32)
 
     # Surface pressure: Pa -> hPa
-    sp_pa = ds_avg["sp"].values.astype(float)
+    sp_pa = ds_avg["sp"].values.astype(np.float32)
     sp_hpa = sp_pa / 100.0
 
     # Derived: wind speed and direction
@@ -119,14 +125,16 @@ def _compute_relative_humidity(temp_c: np.ndarray, dewpoint_c: np.ndarray) -> np
     Compute relative humidity from temperature and dewpoint
     using the August-Roche-Magnus approximation.
     """
-    a = 17.67
-    b = 243.5
-
-    es_t = 6.112 * np.exp(a * temp_c / (temp_c + b))
-    es_td = 6.112 * np.exp(a * dewpoint_c / (dewpoint_c + b))
-
-    rh = 100.0 * es_td / es_t
-    return np.clip(rh, 0, 100)
+    a = np.float32(17.67)
+    b = np.float32(243.5)
+
+    # es(Td) / es(T) = exp(a*Td/(Td+b) - a*T/(T+b)); the 6.112 hPa
+    # prefactors cancel, so one exp over a reused buffer suffices
+    x = a * dewpoint_c / (dewpoint_c + b)
+    x -= a * temp_c / (temp_c + b)
+    rh = np.exp(x, out=x)
+    rh *= 100
+    return np.clip(rh, 0, 100, out=rh)
 
 
 def _sanity_check(df: pd.DataFrame, city_key: str) -> None:
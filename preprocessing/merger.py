@@ -9,6 +9,7 @@ from pathlib import Path
 import pandas as pd
 
 from config import FINAL_DIR
+from converters.combine_pm25_sources import utc_strings
 
 logger = logging.getLogger(__name__)
 
@@ -24,11 +25,12 @@ def merge_pm25_era5(
     within each hour per station, then joined with ERA5.
     """
     output_path = FINAL_DIR / f"{city_key}_pinn_dataset.csv"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
 
     # Checkpointing
     if output_path.exists() and output_path.stat().st_size > 100:
         logger.info(f"  Skipping {city_key} merge (file exists)")
-        return pd.read_csv(output_path, parse_dates=["datetime_utc"])
+        return pd.read_csv(output_path, parse_dates=["datetime_utc"], date_format="ISO8601")
 
     if pm25_df.empty:
         logger.warning(f"  {city_key}: No PM2.5 data to merge")
@@ -36,19 +38,20 @@ def merge_pm25_era5(
         df.to_csv(output_path, index=False)
         return df
 
-    # Ensure datetime types
-    pm25_df = pm25_df.copy()
-    era5_df = era5_df.copy()
-
-    pm25_df["datetime_utc"] = pd.to_datetime(pm25_df["datetime_utc"], utc=True)
-    era5_df["datetime_utc"] = pd.to_datetime(era5_df["datetime_utc"], utc=True)
+    # Ensure datetime types; the converted timestamps are used as keys
+    # directly, so neither input frame is copied or modified
+    pm25_times = pd.to_datetime(pm25_df["datetime_utc"], utc=True)
+    era5_times = pd.DatetimeIndex(
+        pd.to_datetime(era5_df["datetime_utc"], utc=True), name="datetime_utc"
+    )
 
     # Step 1: Round PM2.5 timestamps to nearest hour
-    pm25_df["datetime_hour"] = pm25_df["datetime_utc"].dt.round("h")
+    datetime_hour = pm25_times.dt.round("h").rename("datetime_hour")
 
-    # Step 2: Average sub-hourly observations within each hour per station
+    # Step 2: Average sub-hourly observations within each hour per station;
+    # group order is irrelevant because the merged result is sorted below
     pm25_hourly = (
-        pm25_df.groupby(["location_id", "datetime_hour"])
+        pm25_df.groupby([pm25_df["location_id"], datetime_hour], sort=False)
         .agg(
             pm25=("pm25", "mean"),
             lat=("lat", "first"),
@@ -65,12 +68,12 @@ def merge_pm25_era5(
         f"across {pm25_hourly['location_id'].nunique()} stations"
     )
 
-    # Step 3: Merge with ERA5 on datetime
-    merged = pm25_hourly.merge(
-        era5_df,
+    # Step 3: Join with ERA5, looked up on its (sorted, hourly) time index
+    merged = pm25_hourly.join(
+        era5_df.drop(columns="datetime_utc").set_axis(era5_times).sort_index(),
         on="datetime_utc",
         how="left",
-        suffixes=("", "_era5"),
+        rsuffix="_era5",
     )
 
     # Step 4: Check for unmatched rows
@@ -104,7 +107,7 @@ def merge_pm25_era5(
     merged = merged.sort_values(["datetime_utc", "location_id"]).reset_index(drop=True)
 
     # Save
-    merged.to_csv(output_path, index=False)
+    _to_csv(merged, output_path)
 
     # Log coverage
     era5_hours = len(era5_df)
@@ -119,25 +122,33 @@ def merge_pm25_era5(
     return merged
 
 
-def create_combined_dataset(datasets: dict[str, pd.DataFrame]) -> pd.DataFrame:
-    """Concatenate per-city datasets into a single combined file."""
+def create_combined_dataset(datasets: dict[str, pd.DataFrame]) -> Path | None:
+    """
+    Write per-city datasets into a single combined file, sorted by city,
+    time and station. Cities are appended one at a time rather than
+    concatenated in memory. Returns the combined path (None if no data).
+    """
     combined_path = FINAL_DIR / "combined_pinn_dataset.csv"
 
-    dfs = [df for df in datasets.values() if not df.empty]
-    if not dfs:
+    cities = [city_key for city_key in sorted(datasets) if not datasets[city_key].empty]
+    if not cities:
         logger.warning("No data to combine")
-        return pd.DataFrame()
+        return None
 
-    combined = pd.concat(dfs, ignore_index=True)
-    combined = combined.sort_values(["city", "datetime_utc", "location_id"])
-    combined.to_csv(combined_path, index=False)
+    n_records = 0
+    combined_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(combined_path, "w", newline="") as f:
+        for i, city_key in enumerate(cities):
+            df = datasets[city_key].sort_values(["datetime_utc", "location_id"])
+            _to_csv(df, f, header=i == 0)
+            n_records += len(df)
 
     logger.info(
-        f"Combined dataset: {len(combined)} records from "
-        f"{combined['city'].nunique()} cities -> {combined_path}"
+        f"Combined dataset: {n_records} records from "
+        f"{len(cities)} cities -> {combined_path}"
     )
 
-    return combined
+    return combined_path
 
 
 def _empty_merged_df() -> pd.DataFrame:
@@ -148,3 +159,17 @@ def _empty_merged_df() -> pd.DataFrame:
         "temperature_2m", "relative_humidity",
         "boundary_layer_height", "surface_pressure",
     ])
+
+
+def _to_csv(df: pd.DataFrame, path_or_buf, header: bool = True) -> None:
+    """
+    Write a final dataset, rendering the UTC timestamps in one NumPy pass
+    (same text as pandas' own tz-aware formatting, which goes per element).
+    """
+    times = df["datetime_utc"]
+    if not isinstance(times.dtype, pd.DatetimeTZDtype):
+        df.to_csv(path_or_buf, index=False, header=header)
+        return
+    df.assign(datetime_utc=utc_strings(times)).to_csv(
+        path_or_buf, index=False, header=header
+    )
@@ -23,13 +23,12 @@ TOTAL_HOURS = 8784 if isleap(YEAR) else 8760
 
 
 def _haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance in km between two lat/lon points."""
-    from math import radians, cos, sin, asin, sqrt
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    """Calculate distance in km between lat/lon points (scalars or arrays)."""
+    lon1, lat1, lon2, lat2 = map(np.radians, [lon1, lat1, lon2, lat2])
     dlon = lon2 - lon1
     dlat = lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    c = 2 * np.arcsin(np.sqrt(a))
     return 6371 * c
 
 
@@ -39,13 +38,20 @@ def clean_pm25(raw_csv_path: Path, city_key: str) -> pd.DataFrame:
     Returns cleaned DataFrame.
     """
     output_path = PROCESSED_DIR / f"{city_key}_pm25_cleaned.csv"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
 
     # Checkpointing
     if output_path.exists() and output_path.stat().st_size > 100:
         logger.info(f"  Skipping {city_key} PM2.5 cleaning (file exists)")
-        return pd.read_csv(output_path, parse_dates=["datetime_utc"])
-
-    df = pd.read_csv(raw_csv_path)
+        return pd.read_csv(output_path, parse_dates=["datetime_utc"], date_format="ISO8601")
+
+    # Typed read: skip the unused period-end column and declare the
+    # numeric/text columns up front instead of inferring them
+    df = pd.read_csv(
+        raw_csv_path,
+        usecols=lambda c: c != "datetime_to",
+        dtype={"location_name": str, "pm25": "float64", "coverage_pct": "float64"},
+    )
     initial_count = len(df)
 
     if df.empty:
@@ -59,8 +65,15 @@ def clean_pm25(raw_csv_path: Path, city_key: str) -> pd.DataFrame:
 
     logger.info(f"  {city_key}: Starting cleaning with {initial_count} records")
 
+    # Station ids are grouped/filtered in every stage below; categorical
+    # codes make those integer ops (restored to plain ids before saving)
+    id_dtype = df["location_id"].dtype
+    df["location_id"] = df["location_id"].astype("category")
+
     # Stage 1: Basic validation
-    df["datetime_utc"] = pd.to_datetime(df["datetime_utc"], errors="coerce", utc=True)
+    df["datetime_utc"] = pd.to_datetime(
+        df["datetime_utc"], errors="coerce", utc=True, format="ISO8601"
+    )
     before = len(df)
     df = df.dropna(subset=["datetime_utc", "pm25"])
     df = df[(df["pm25"] >= PM25_MIN) & (df["pm25"] <= PM25_MAX)]
@@ -84,10 +97,10 @@ def clean_pm25(raw_csv_path: Path, city_key: str) -> pd.DataFrame:
 
         before = len(df)
         # Calculate distance for each station
-        station_coords = df.groupby('location_id').agg({'lat': 'first', 'lon': 'first'})
-        station_coords['distance_km'] = station_coords.apply(
-            lambda row: _haversine_distance(city_lat, city_lon, row['lat'], row['lon']),
-            axis=1
+        station_coords = df.groupby('location_id', observed=True).agg({'lat': 'first', 'lon': 'first'})
+        station_coords['distance_km'] = _haversine_distance(
+            city_lat, city_lon,
+            station_coords['lat'].to_numpy(), station_coords['lon'].to_numpy(),
         )
 
         # Filter stations within radius
@@ -109,42 +122,44 @@ def clean_pm25(raw_csv_path: Path, city_key: str) -> pd.DataFrame:
             f"({before - len(df)} removed)"
         )
 
+    # Single-station cities (e.g. Kandy) skip the per-station groupbys
+    single_station = df["location_id"].notna().all() and df["location_id"].nunique() == 1
+
     # Stage 3: IQR-based outlier removal per station
     before = len(df)
-    clean_dfs = []
-    for lid, group in df.groupby("location_id"):
-        q1 = group["pm25"].quantile(0.25)
-        q3 = group["pm25"].quantile(0.75)
-        iqr = q3 - q1
-        lower = q1 - PM25_IQR_MULTIPLIER * iqr
-        upper = q3 + PM25_IQR_MULTIPLIER * iqr
-        filtered = group[(group["pm25"] >= lower) & (group["pm25"] <= upper)]
-        clean_dfs.append(filtered)
-
-    df = pd.concat(clean_dfs, ignore_index=True) if clean_dfs else _empty_df()
+    if single_station:
+        q1, q3 = df["pm25"].quantile([0.25, 0.75])
+    else:
+        # Broadcast each station's quartiles back to its rows, then mask once
+        pm25_by_station = df.groupby("location_id", observed=True)["pm25"]
+        q1 = pm25_by_station.transform("quantile", 0.25)
+        q3 = pm25_by_station.transform("quantile", 0.75)
+    iqr = q3 - q1
+    lower = q1 - PM25_IQR_MULTIPLIER * iqr
+    upper = q3 + PM25_IQR_MULTIPLIER * iqr
+    df = df[(df["pm25"] >= lower) & (df["pm25"] <= upper)]
     logger.info(
         f"    Stage 3 (IQR outliers): {before} -> {len(df)} "
         f"({before - len(df)} removed)"
     )
 
     if df.empty:
+        df = _empty_df()
         df.to_csv(output_path, index=False)
         return df
 
     # Stage 4: Temporal spike detection
     before = len(df)
-    clean_dfs = []
-    for lid, group in df.groupby("location_id"):
-        group = group.sort_values("datetime_utc").reset_index(drop=True)
-        pm = group["pm25"]
-        diff_prev = (pm - pm.shift(1)).abs()
-        diff_next = (pm - pm.shift(-1)).abs()
-        is_spike = (diff_prev > PM25_SPIKE_THRESHOLD) & (
-            diff_next > PM25_SPIKE_THRESHOLD
-        )
-        clean_dfs.append(group[~is_spike])
-
-    df = pd.concat(clean_dfs, ignore_index=True) if clean_dfs else _empty_df()
+    # One global sort, then neighbours are shifted within each station
+    df = df.sort_values(["location_id", "datetime_utc"], kind="stable").reset_index(drop=True)
+    pm = df["pm25"]
+    pm_by_station = pm if single_station else pm.groupby(df["location_id"], observed=True)
+    diff_prev = (pm - pm_by_station.shift(1)).abs()
+    diff_next = (pm - pm_by_station.shift(-1)).abs()
+    is_spike = (diff_prev > PM25_SPIKE_THRESHOLD) & (
+        diff_next > PM25_SPIKE_THRESHOLD
+    )
+    df = df[~is_spike].reset_index(drop=True)
     logger.info(
         f"    Stage 4 (spike removal): {before} -> {len(df)} "
         f"({before - len(df)} removed)"
@@ -152,9 +167,10 @@ def clean_pm25(raw_csv_path: Path, city_key: str) -> pd.DataFrame:
 
     # Stage 5: Station completeness filter
     before_stations = df["location_id"].nunique()
-    station_counts = df.groupby("location_id").size()
+    # Counts come straight from the categorical codes, in station id order
+    station_counts = df["location_id"].value_counts(sort=False)
     min_records = int(TOTAL_HOURS * STATION_MIN_COVERAGE)
-    valid_stations = station_counts[station_counts >= min_records].index
+    valid_stations = station_counts.index[station_counts >= min_records]
     df = df[df["location_id"].isin(valid_stations)]
 
     after_stations = df["location_id"].nunique()
@@ -180,6 +196,7 @@ def clean_pm25(raw_csv_path: Path, city_key: str) -> pd.DataFrame:
         "sensor_id", "lat", "lon", "pm25",
     ]
     df = df[[c for c in keep_cols if c in df.columns]]
+    df = df.astype({"location_id": id_dtype})
 
     # Save
     df.to_csv(output_path, index=False)
@@ -4,11 +4,15 @@ Run this script if you haven't set up your Copernicus CDS credentials.
 """
 
 import os
+import re
 import logging
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Result of the last .cdsapirc check, keyed by (path, mtime)
+_config_cache: dict = {"stamp": None, "ok": False}
+
 
 def _get_cdsapirc_path() -> Path:
     return Path.home() / ".cdsapirc"
@@ -16,13 +20,17 @@ def _get_cdsapirc_path() -> Path:
 
 def _check_existing_config() -> bool:
     rc_path = _get_cdsapirc_path()
-    if not rc_path.exists():
+    try:
+        stamp = (rc_path, rc_path.stat().st_mtime_ns)
+    except OSError:
         return False
 
-    content = rc_path.read_text().strip()
-    has_url = "url:" in content
-    has_key = "key:" in content
-    if has_url and has_key:
+    # Re-read the file only when it has changed since the last check
+    if _config_cache["stamp"] != stamp:
+        found = set(re.findall(r"(url|key):", rc_path.read_text()))
+        _config_cache.update(stamp=stamp, ok=found == {"url", "key"})
+
+    if _config_cache["ok"]:
         logger.info(f"Found existing CDS API config at {rc_path}")
         return True
     return False
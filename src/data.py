@@ -16,7 +16,8 @@ from typing import Tuple, Dict, Optional
 def generate_collocation_points_1d(x_range: Tuple[float, float],
                                     t_range: Tuple[float, float],
                                     n_points: int = 1000,
-                                    method: str = 'random') -> Dict[str, torch.Tensor]:
+                                    method: str = 'random',
+                                    requires_grad: bool = False) -> Dict[str, torch.Tensor]:
     """
     Generate collocation points for 1D PINN training.
     
@@ -28,6 +29,8 @@ def generate_collocation_points_1d(x_range: Tuple[float, float],
         t_range: (t_min, t_max) temporal domain
         n_points: Number of collocation points
         method: 'random' or 'grid'
+        requires_grad: Return leaf tensors with gradients enabled, ready for
+                       the physics residual (set once instead of every step)
     
     Returns:
         Dict with 'x' and 't' tensors, each of shape (n_points,)
@@ -43,9 +46,13 @@ def generate_collocation_points_1d(x_range: Tuple[float, float],
         n_t = n_points // n_x
         x_grid = torch.linspace(x_min, x_max, n_x)
         t_grid = torch.linspace(t_min, t_max, n_t)
-        x, t = torch.meshgrid(x_grid, t_grid, indexing='ij')
-        x = x.flatten()
-        t = t.flatten()
+        # Flattened 'ij' grid, built directly from the 1-D axes
+        x = x_grid.repeat_interleave(n_t)
+        t = t_grid.repeat(n_x)
+    
+    if requires_grad:
+        x.requires_grad_(True)
+        t.requires_grad_(True)
     
     return {'x': x, 't': t}
 
@@ -54,7 +61,9 @@ def generate_collocation_points_2d(x_range: Tuple[float, float],
                                     y_range: Tuple[float, float],
                                     t_range: Tuple[float, float],
                                     n_points: int = 5000,
-                                    method: str = 'random') -> Dict[str, torch.Tensor]:
+                                    method: str = 'random',
+                                    device: Optional[torch.device] = None,
+                                    requires_grad: bool = False) -> Dict[str, torch.Tensor]:
     """
     Generate collocation points for 2D PINN training.
     
@@ -63,7 +72,10 @@ def generate_collocation_points_2d(x_range: Tuple[float, float],
         y_range: (y_min, y_max) spatial domain
         t_range: (t_min, t_max) temporal domain
         n_points: Number of collocation points
-        method: 'random' or 'latin_hypercube'
+        method: 'random', 'latin_hypercube' or 'r_sequence' (quasirandom)
+        device: Device to sample on (default: CPU)
+        requires_grad: Return leaf tensors with gradients enabled, ready for
+                       the physics residual (set once instead of every step)
     
     Returns:
         Dict with 'x', 'y', and 't' tensors
@@ -73,20 +85,33 @@ def generate_collocation_points_2d(x_range: Tuple[float, float],
     t_min, t_max = t_range
     
     if method == 'random':
-        x = torch.rand(n_points) * (x_max - x_min) + x_min
-        y = torch.rand(n_points) * (y_max - y_min) + y_min
-        t = torch.rand(n_points) * (t_max - t_min) + t_min
+        x = torch.rand(n_points, device=device) * (x_max - x_min) + x_min
+        y = torch.rand(n_points, device=device) * (y_max - y_min) + y_min
+        t = torch.rand(n_points, device=device) * (t_max - t_min) + t_min
     elif method == 'latin_hypercube':
         # Latin Hypercube Sampling for better coverage
-        from scipy.stats import qmc
-        sampler = qmc.LatinHypercube(d=3)
-        sample = sampler.random(n=n_points)
-        x = torch.tensor(sample[:, 0] * (x_max - x_min) + x_min, dtype=torch.float32)
-        y = torch.tensor(sample[:, 1] * (y_max - y_min) + y_min, dtype=torch.float32)
-        t = torch.tensor(sample[:, 2] * (t_max - t_min) + t_min, dtype=torch.float32)
+        sample = _latin_hypercube(n_points, 3, device=device)
+        x = sample[:, 0] * (x_max - x_min) + x_min
+        y = sample[:, 1] * (y_max - y_min) + y_min
+        t = sample[:, 2] * (t_max - t_min) + t_min
+    elif method == 'r_sequence':
+        # Additive-recurrence low-discrepancy sequence; too few points
+        # cover the domain poorly, so small sets fall back to LHS
+        if n_points >= 10:
+            sample = _r_sequence(n_points, 3, device=device)
+        else:
+            sample = _latin_hypercube(n_points, 3, device=device)
+        x = sample[:, 0] * (x_max - x_min) + x_min
+        y = sample[:, 1] * (y_max - y_min) + y_min
+        t = sample[:, 2] * (t_max - t_min) + t_min
     else:
         raise ValueError(f"Unknown method: {method}")
     
+    if requires_grad:
+        x.requires_grad_(True)
+        y.requires_grad_(True)
+        t.requires_grad_(True)
+    
     return {'x': x, 'y': y, 't': t}
 
 
@@ -107,30 +132,57 @@ def generate_boundary_points_1d(x_range: Tuple[float, float],
         n_points: Points per boundary
     
     Returns:
-        Dict with boundary point information
+        Dict with boundary point information (see concat_boundary_points
+        to evaluate all boundaries at once)
     """
     x_min, x_max = x_range
     t_min, t_max = t_range
     
-    t_boundary = torch.linspace(t_min, t_max, n_points)
-    x_initial = torch.linspace(x_min, x_max, n_points)
+    # One (coordinate, boundary, point) buffer; every entry below is a
+    # contiguous view into it
+    buf = torch.empty(2, 3, n_points)
+    x, t = buf
+    torch.linspace(t_min, t_max, n_points, out=t[0])
+    t[1] = t[0]
+    t[2] = t_min
+    x[0] = x_min
+    x[1] = x_max
+    torch.linspace(x_min, x_max, n_points, out=x[2])
     
     return {
         'left': {
-            'x': torch.full((n_points,), x_min),
-            't': t_boundary
+            'x': x[0],
+            't': t[0]
         },
         'right': {
-            'x': torch.full((n_points,), x_max),
-            't': t_boundary
+            'x': x[1],
+            't': t[1]
         },
         'initial': {
-            'x': x_initial,
-            't': torch.full((n_points,), t_min)
+            'x': x[2],
+            't': t[2]
         }
     }
 
 
+def concat_boundary_points(boundaries: Dict[str, Dict[str, torch.Tensor]]) -> Dict[str, torch.Tensor]:
+    """
+    Concatenate the points of every boundary, e.g. to evaluate the model
+    on all of them in one call.
+    
+    Args:
+        boundaries: Output of generate_boundary_points_1d()
+    
+    Returns:
+        Dict with one tensor per coordinate, boundaries in dict order
+    """
+    coords = next(iter(boundaries.values())).keys()
+    return {
+        key: torch.cat([points[key] for points in boundaries.values()])
+        for key in coords
+    }
+
+
 def normalize_data(data: torch.Tensor, 
                    method: str = 'minmax') -> Tuple[torch.Tensor, Dict]:
     """
@@ -143,16 +195,21 @@ def normalize_data(data: torch.Tensor,
     Returns:
         Normalized data and normalization parameters for inverse transform
     """
+    # Divide by the spread itself; only a (near-)constant input, whose
+    # spread is below 1e-8, is left unscaled instead of dividing by ~0
     if method == 'minmax':
         data_min = data.min()
         data_max = data.max()
-        normalized = (data - data_min) / (data_max - data_min + 1e-8)
-        params = {'min': data_min, 'max': data_max, 'method': 'minmax'}
+        diff = data_max - data_min
+        scale = torch.where(diff > 1e-8, diff, torch.ones_like(diff))
+        normalized = (data - data_min) / scale
+        params = {'min': data_min, 'max': data_max, 'scale': scale, 'method': 'minmax'}
     elif method == 'standard':
         mean = data.mean()
         std = data.std()
-        normalized = (data - mean) / (std + 1e-8)
-        params = {'mean': mean, 'std': std, 'method': 'standard'}
+        scale = torch.where(std > 1e-8, std, torch.ones_like(std))
+        normalized = (data - mean) / scale
+        params = {'mean': mean, 'std': std, 'scale': scale, 'method': 'standard'}
     else:
         raise ValueError(f"Unknown normalization method: {method}")
     
@@ -170,10 +227,56 @@ def denormalize_data(data: torch.Tensor, params: Dict) -> torch.Tensor:
     Returns:
         Data in original scale
     """
+    # Params made before 'scale' was stored only have the raw spread
     if params['method'] == 'minmax':
-        return data * (params['max'] - params['min']) + params['min']
+        scale = params.get('scale', params['max'] - params['min'])
+        return data * scale + params['min']
     else:  # standard
-        return data * params['std'] + params['mean']
+        scale = params.get('scale', params['std'])
+        return data * scale + params['mean']
+
+
+class CollocationBuffer2D:
+    """
+    Device-resident collocation points for 2D PINN training, redrawn
+    uniformly in place each step.
+    
+    Fresh points every iteration help PINN convergence; refilling one
+    preallocated (3, N) tensor gives that without new allocations. The
+    returned x, y, t are row views of the buffer with gradients enabled
+    (the buffer itself does not track gradients), so each step must
+    finish its backward pass before resample().
+    """
+    
+    def __init__(self, n_points: int,
+                 x_range: Tuple[float, float],
+                 y_range: Tuple[float, float],
+                 t_range: Tuple[float, float],
+                 device: Optional[torch.device] = None):
+        """
+        Args:
+            n_points: Number of collocation points
+            x_range, y_range, t_range: (min, max) of each coordinate
+            device: Device to keep the points on (default: CPU)
+        """
+        ranges = torch.tensor([x_range, y_range, t_range], dtype=torch.float32, device=device)
+        self.offset = ranges[:, :1]
+        self.scale = ranges[:, 1:] - ranges[:, :1]
+        
+        self.buffer = torch.empty(3, n_points, device=device)
+        self.points = {
+            key: self.buffer[i].requires_grad_(True) for i, key in enumerate('xyt')
+        }
+        self.resample()
+    
+    def resample(self) -> Dict[str, torch.Tensor]:
+        """Draw new points into the buffer and return the x, y, t views."""
+        with torch.no_grad():
+            self.buffer.uniform_().mul_(self.scale).add_(self.offset)
+        # Drop coordinate gradients left by the previous step's backward
+        for point in self.points.values():
+            point.grad = None
+        return self.points
 
 
 class PINNDataset(torch.utils.data.Dataset):
@@ -184,30 +287,82 @@ class PINNDataset(torch.utils.data.Dataset):
     - Collocation points (for physics loss)
     - Boundary points (for BC loss)
     - Sensor data (for data loss)
+    
+    With batched=True, DataLoader batches are gathered with one index per
+    coordinate tensor (__getitems__) instead of per point; that result is
+    already stacked, so pass collate_fn=PINNDataset.collate as well.
     """
     
     def __init__(self, 
-                 collocation_points: Dict[str, torch.Tensor],
-                 sensor_data: Optional[Dict[str, torch.Tensor]] = None):
+                 collocation_points,
+                 sensor_data: Optional[Dict[str, torch.Tensor]] = None,
+                 batched: bool = False):
         """
         Args:
-            collocation_points: Dict with coordinate tensors
+            collocation_points: Dict with coordinate tensors, or a single
+                                (N, d) tensor of stacked coordinates
             sensor_data: Dict with 'coords' and 'values' (optional)
+            batched: Gather whole batches at once (requires
+                     collate_fn=PINNDataset.collate)
         """
         self.collocation_points = collocation_points
         self.sensor_data = sensor_data
+        self.batched = batched
         
         # Get number of collocation points
-        first_key = list(collocation_points.keys())[0]
-        self.n_collocation = len(collocation_points[first_key])
+        if isinstance(collocation_points, torch.Tensor):
+            self.n_collocation = len(collocation_points)
+        else:
+            first_key = list(collocation_points.keys())[0]
+            self.n_collocation = len(collocation_points[first_key])
     
     def __len__(self):
         return self.n_collocation
     
     def __getitem__(self, idx):
         # Return collocation point at index
+        if isinstance(self.collocation_points, torch.Tensor):
+            return self.collocation_points[idx]
         point = {key: val[idx] for key, val in self.collocation_points.items()}
         return point
+    
+    def __getitems__(self, indices):
+        # Return a whole batch of collocation points in one gather, or a
+        # list of points for the default collate
+        if self.batched:
+            return self[torch.as_tensor(indices)]
+        return [self[idx] for idx in indices]
+    
+    @staticmethod
+    def collate(batch):
+        """DataLoader collate_fn for batches that are already stacked."""
+        return batch
+
+
+def _latin_hypercube(n: int, d: int, device: Optional[torch.device] = None) -> torch.Tensor:
+    """
+    Latin hypercube sample of n points in [0, 1)^d: each axis gets one
+    jittered point per stratum, with strata shuffled independently per axis.
+    """
+    sample = torch.rand(n, d, device=device)
+    for j in range(d):
+        sample[:, j] += torch.randperm(n, device=device)
+    return sample / n
+
+
+def _r_sequence(n: int, d: int, device: Optional[torch.device] = None) -> torch.Tensor:
+    """
+    First n points of the d-dimensional R-sequence in [0, 1)^d:
+    u_k = frac(0.5 + k * alpha), with alpha_j = phi_d^-j and phi_d the
+    root of phi^(d+1) = phi + 1 (generalised golden ratio).
+    """
+    phi = 2.0
+    for _ in range(30):
+        phi = (1 + phi) ** (1 / (d + 1))
+    alpha = (1 / phi) ** torch.arange(1, d + 1, dtype=torch.float64, device=device)
+    k = torch.arange(1, n + 1, dtype=torch.float64, device=device).unsqueeze(1)
+    # Accumulate in float64 so the fractional parts stay accurate for large n
+    return torch.frac(0.5 + k * alpha).float()
 
 
 # ============================================================
@@ -15,25 +15,35 @@ class SimpleMLP(nn.Module):
     Simple Multi-Layer Perceptron for PINN.
     
     This is the basic architecture suitable for learning PDEs.
-    Uses Tanh activation for smooth derivatives (important for autograd).
+    Uses Tanh activation by default for smooth derivatives (important for
+    autograd); tanh-approximated GELU is available as a smooth alternative.
     """
     
-    def __init__(self, input_dim, hidden_dims, output_dim=1):
+    ACTIVATIONS = {
+        'tanh': nn.Tanh,
+        'gelu': lambda: nn.GELU(approximate='tanh'),
+    }
+    
+    def __init__(self, input_dim, hidden_dims, output_dim=1, activation='tanh'):
         """
         Args:
             input_dim: Number of input features (e.g., 2 for x,t or 3 for x,y,t)
             hidden_dims: List of hidden layer sizes (e.g., [64, 64, 64])
             output_dim: Number of outputs (1 for concentration)
+            activation: 'tanh' or 'gelu' (tanh-approximated GELU)
         """
         super().__init__()
         
+        if activation not in self.ACTIVATIONS:
+            raise ValueError(f"Unknown activation: {activation}")
+        
         layers = []
         prev_dim = input_dim
         
         # Hidden layers
         for hidden_dim in hidden_dims:
             layers.append(nn.Linear(prev_dim, hidden_dim))
-            layers.append(nn.Tanh())  # Tanh is smooth - good for PDE derivatives
+            layers.append(self.ACTIVATIONS[activation]())  # smooth - good for PDE derivatives
             prev_dim = hidden_dim
         
         # Output layer (no activation - we want unbounded concentration values)
@@ -62,59 +72,108 @@ class SimpleMLP(nn.Module):
             Output tensor of shape (batch_size, output_dim)
         """
         return self.network(x)
+    
+    def forward_coords(self, *coords):
+        """
+        Forward pass on separate 1-D coordinate tensors (e.g. x, y, t).
+        
+        The first linear layer is applied one coordinate column at a time,
+        so no stacked (N, input_dim) copy of the inputs is built. Gradients
+        still flow back to each coordinate tensor.
+        
+        Args:
+            *coords: input_dim tensors of shape (batch_size,)
+        
+        Returns:
+            Output tensor of shape (batch_size, output_dim)
+        """
+        first = self.network[0]
+        h = first.bias
+        for i, c in enumerate(coords):
+            h = torch.addcmul(h, c.unsqueeze(-1), first.weight[:, i])
+        return self.network[1:](h)
 
 
-class PINN_1D(nn.Module):
+class _PINNBase(SimpleMLP):
+    """
+    SimpleMLP that still loads checkpoints from the old wrapper layout,
+    where the MLP sat in a `net` attribute ('net.network.*' keys).
+    """
+    
+    @property
+    def net(self):
+        """The underlying SimpleMLP (the model itself, kept for old callers)."""
+        return self
+    
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        old_prefix = prefix + 'net.'
+        for key in [k for k in state_dict if k.startswith(old_prefix)]:
+            state_dict[prefix + key[len(old_prefix):]] = state_dict.pop(key)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+
+class PINN_1D(_PINNBase):
     """
     1D Physics-Informed Neural Network.
     
-    Specialized for 1D advection-diffusion: C(x, t)
+    Specialized for 1D advection-diffusion: C(x, t). A SimpleMLP itself
+    (not a wrapper around one), so each call is a single module dispatch.
     """
     
-    def __init__(self, hidden_dims=[64, 64, 64, 64]):
+    def __init__(self, hidden_dims=[64, 64, 64, 64], activation='tanh'):
         """
         Args:
             hidden_dims: List of hidden layer sizes
+            activation: Hidden-layer activation ('tanh' or 'gelu')
         """
-        super().__init__()
-        self.net = SimpleMLP(input_dim=2, hidden_dims=hidden_dims, output_dim=1)
+        super().__init__(input_dim=2, hidden_dims=hidden_dims, output_dim=1,
+                         activation=activation)
     
-    def forward(self, inputs):
+    def forward(self, inputs, t=None):
         """
         Args:
             inputs: Tensor of shape (N, 2) where columns are [x, t]
-                    OR can pass x and t separately
+                    OR the x tensor of shape (N,) with t passed separately
+            t: Tensor of shape (N,) (only when x is passed separately)
         
         Returns:
             Concentration C of shape (N, 1)
         """
-        return self.net(inputs)
+        if t is not None:
+            return self.forward_coords(inputs, t)
+        return self.network(inputs)
 
 
-class PINN_2D(nn.Module):
+class PINN_2D(_PINNBase):
     """
     2D Physics-Informed Neural Network.
     
-    Specialized for 2D advection-diffusion: C(x, y, t)
+    Specialized for 2D advection-diffusion: C(x, y, t). A SimpleMLP itself
+    (not a wrapper around one), so each call is a single module dispatch.
     """
     
-    def __init__(self, hidden_dims=[64, 64, 64, 64, 64, 64]):
+    def __init__(self, hidden_dims=[64, 64, 64, 64, 64, 64], activation='tanh'):
         """
         Args:
             hidden_dims: List of hidden layer sizes (deeper for 2D)
+            activation: Hidden-layer activation ('tanh' or 'gelu')
         """
-        super().__init__()
-        self.net = SimpleMLP(input_dim=3, hidden_dims=hidden_dims, output_dim=1)
+        super().__init__(input_dim=3, hidden_dims=hidden_dims, output_dim=1,
+                         activation=activation)
     
-    def forward(self, inputs):
+    def forward(self, inputs, y=None, t=None):
         """
         Args:
             inputs: Tensor of shape (N, 3) where columns are [x, y, t]
+                    OR the x tensor of shape (N,) with y and t passed separately
+            y, t: Tensors of shape (N,) (only when x is passed separately)
         
         Returns:
             Concentration C of shape (N, 1)
         """
-        return self.net(inputs)
+        if y is not None:
+            return self.forward_coords(inputs, y, t)
+        return self.network(inputs)
 
 
 class FourierFeatureNetwork(nn.Module):
@@ -148,6 +207,14 @@ class FourierFeatureNetwork(nn.Module):
         B = torch.randn(input_dim, num_frequencies) * frequency_scale
         self.register_buffer('B', B)
         
+        # Derived from B (not saved): B with the 2π folded in and repeated
+        # for the sin and cos halves, plus a π/2 phase on the cos half, so
+        # encoding is one addmm plus one sin
+        self.register_buffer('B_scaled', torch.empty(input_dim, 2 * num_frequencies),
+                             persistent=False)
+        self.register_buffer('phase', torch.zeros(2 * num_frequencies), persistent=False)
+        self._derive_encoding()
+        
         # Network takes encoded features as input
         encoded_dim = 2 * num_frequencies  # sin and cos for each frequency
         self.net = SimpleMLP(encoded_dim, hidden_dims, output_dim)
@@ -155,14 +222,24 @@ class FourierFeatureNetwork(nn.Module):
     def encode(self, x):
         """Apply Fourier feature encoding."""
         # x shape: (batch, input_dim)
-        # B shape: (input_dim, num_frequencies)
-        proj = torch.matmul(x, self.B)  # (batch, num_frequencies)
-        return torch.cat([torch.sin(2 * np.pi * proj), 
-                         torch.cos(2 * np.pi * proj)], dim=-1)
+        # B_scaled shape: (input_dim, 2 * num_frequencies)
+        # -> [sin(2π xB), cos(2π xB)], shape (batch, 2 * num_frequencies)
+        return torch.sin(torch.addmm(self.phase, x, self.B_scaled))
     
     def forward(self, x):
         encoded = self.encode(x)
         return self.net(encoded)
+    
+    def _derive_encoding(self):
+        """Refresh B_scaled and phase from B."""
+        with torch.no_grad():
+            self.B_scaled.copy_((2 * np.pi * self.B).repeat(1, 2))
+            self.phase.zero_()
+            self.phase[self.num_frequencies:] = np.pi / 2
+    
+    def _load_from_state_dict(self, *args, **kwargs):
+        super()._load_from_state_dict(*args, **kwargs)
+        self._derive_encoding()
 
 
 # ============================================================
@@ -56,17 +56,23 @@ def advection_diffusion_residual_1d(model, x, t, u, D, S=0.0):
     Returns:
         Tensor - residual (should be ~0 where physics is satisfied)
     """
-    # Ensure gradients are tracked
-    x = x.requires_grad_(True)
-    t = t.requires_grad_(True)
-    
-    # Forward pass: predict concentration
-    inputs = torch.stack([x, t], dim=-1)
-    C = model(inputs)
-    
-    # First derivatives
-    C_t = compute_gradients(C, t)  # ∂C/∂t
-    C_x = compute_gradients(C, x)  # ∂C/∂x
+    # Ensure gradients are tracked (points generated with requires_grad=True
+    # are used as they are)
+    if not (x.requires_grad and t.requires_grad):
+        x = x.requires_grad_(True)
+        t = t.requires_grad_(True)
+    
+    # Forward pass: predict concentration. SimpleMLP-based models (PINN_1D,
+    # PINN_2D) take the coordinates separately, without a stacked input
+    if hasattr(model, 'forward_coords'):
+        C = model.forward_coords(x, t)
+    else:
+        C = model(torch.stack([x, t], dim=-1))
+    
+    # First derivatives (∂C/∂x, ∂C/∂t) from one backward pass
+    C_x, C_t = torch.autograd.grad(
+        C, (x, t), grad_outputs=torch.ones_like(C), create_graph=True
+    )
     
     # Second derivative
     C_xx = compute_gradients(C_x, x)  # ∂²C/∂x²
@@ -96,19 +102,24 @@ def advection_diffusion_residual_2d(model, x, y, t, u_x, u_y, D, S=0.0):
     Returns:
         Tensor - residual (should be ~0 where physics is satisfied)
     """
-    # Ensure gradients are tracked
-    x = x.requires_grad_(True)
-    y = y.requires_grad_(True)
-    t = t.requires_grad_(True)
-    
-    # Forward pass: predict concentration
-    inputs = torch.stack([x, y, t], dim=-1)
-    C = model(inputs)
-    
-    # First derivatives
-    C_t = compute_gradients(C, t)   # ∂C/∂t
-    C_x = compute_gradients(C, x)   # ∂C/∂x
-    C_y = compute_gradients(C, y)   # ∂C/∂y
+    # Ensure gradients are tracked (points generated with requires_grad=True
+    # are used as they are)
+    if not (x.requires_grad and y.requires_grad and t.requires_grad):
+        x = x.requires_grad_(True)
+        y = y.requires_grad_(True)
+        t = t.requires_grad_(True)
+    
+    # Forward pass: predict concentration. SimpleMLP-based models (PINN_1D,
+    # PINN_2D) take the coordinates separately, without a stacked input
+    if hasattr(model, 'forward_coords'):
+        C = model.forward_coords(x, y, t)
+    else:
+        C = model(torch.stack([x, y, t], dim=-1))
+    
+    # First derivatives (∂C/∂x, ∂C/∂y, ∂C/∂t) from one backward pass
+    C_x, C_y, C_t = torch.autograd.grad(
+        C, (x, y, t), grad_outputs=torch.ones_like(C), create_graph=True
+    )
     
     # Second derivatives (Laplacian components)
     C_xx = compute_gradients(C_x, x)  # ∂²C/∂x²
@@ -128,15 +139,18 @@ class PhysicsLoss(nn.Module):
     at collocation points.
     """
     
-    def __init__(self, D=1.0, equation_type='1d'):
+    def __init__(self, D=1.0, equation_type='1d', mixed_precision=False):
         """
         Args:
             D: Diffusion coefficient
             equation_type: '1d' or '2d'
+            mixed_precision: Evaluate the residual under bfloat16 autocast
+                             (the squared mean is still taken in float32)
         """
         super().__init__()
         self.D = D
         self.equation_type = equation_type
+        self.mixed_precision = mixed_precision
     
     def forward(self, model, collocation_points, velocity, source=0.0):
         """
@@ -151,28 +165,31 @@ class PhysicsLoss(nn.Module):
         Returns:
             Tensor - mean squared physics residual
         """
-        if self.equation_type == '1d':
-            residual = advection_diffusion_residual_1d(
-                model=model,
-                x=collocation_points['x'],
-                t=collocation_points['t'],
-                u=velocity,
-                D=self.D,
-                S=source
-            )
-        else:  # 2d
-            residual = advection_diffusion_residual_2d(
-                model=model,
-                x=collocation_points['x'],
-                y=collocation_points['y'],
-                t=collocation_points['t'],
-                u_x=velocity['u_x'],
-                u_y=velocity['u_y'],
-                D=self.D,
-                S=source
-            )
+        device_type = collocation_points['x'].device.type
+        with torch.autocast(device_type, dtype=torch.bfloat16,
+                            enabled=self.mixed_precision):
+            if self.equation_type == '1d':
+                residual = advection_diffusion_residual_1d(
+                    model=model,
+                    x=collocation_points['x'],
+                    t=collocation_points['t'],
+                    u=velocity,
+                    D=self.D,
+                    S=source
+                )
+            else:  # 2d
+                residual = advection_diffusion_residual_2d(
+                    model=model,
+                    x=collocation_points['x'],
+                    y=collocation_points['y'],
+                    t=collocation_points['t'],
+                    u_x=velocity['u_x'],
+                    u_y=velocity['u_y'],
+                    D=self.D,
+                    S=source
+                )
         
-        return torch.mean(residual ** 2)
+        return residual.float().square().mean()
 
 
 # ============================================================
@@ -0,0 +1,34 @@
+"""Tests for src.data collocation utilities."""
+
+import torch
+
+from torch.utils.data import DataLoader
+
+from src.data import CollocationBuffer2D, PINNDataset, generate_collocation_points_2d
+from src.models import PINN_2D
+from src.physics import PhysicsLoss
+
+
+def test_collocation_buffer_does_not_accumulate_grad():
+    torch.manual_seed(0)
+    model = PINN_2D(hidden_dims=[8, 8])
+    loss_fn = PhysicsLoss(D=0.1, equation_type='2d')
+    buffer = CollocationBuffer2D(64, (0, 10), (0, 5), (0, 24))
+
+    for _ in range(2):
+        points = buffer.resample()
+        assert all(p.grad is None for p in points.values())
+        loss_fn(model, points, {'u_x': 1.0, 'u_y': 0.5}).backward()
+        assert buffer.buffer.grad is None
+
+
+def test_pinn_dataset_batched_matches_default_collate():
+    torch.manual_seed(0)
+    points = generate_collocation_points_2d((0, 1), (0, 1), (0, 1), n_points=50)
+    default = list(DataLoader(PINNDataset(points), batch_size=8))
+    batched = list(DataLoader(PINNDataset(points, batched=True), batch_size=8,
+                              collate_fn=PINNDataset.collate))
+
+    assert len(default) == len(batched)
+    for a, b in zip(default, batched):
+        assert all(torch.equal(a[key], b[key]) for key in points)